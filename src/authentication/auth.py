@@ -9,18 +9,70 @@ from more_itertools import first
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
+from celery import current_app
 from django.contrib.auth.models import User
 from django.conf import settings
-from witswin.caching import cache_function_in_seconds
+from django.db import IntegrityError, transaction
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from core.utils import memcache_lock
+from witswin.caching import memoize
 
 from authentication.models import PrivyProfile, UserProfile
+from authentication.token_cache import verified_token_cache
 
 import requests
 import base64
+import logging
+import math
+import os
+import threading
+import time
 
+from functools import lru_cache
+
+
+logger = logging.getLogger(__name__)
 
 PUBLIC_KEY_URL = settings.PRIVY_JWKS_URL
 
+# Connect and read timeouts of the calls to Privy
+PRIVY_REQUEST_TIMEOUT = (3.05, 10)
+PRIVY_REQUEST_RETRIES = 2
+PRIVY_RETRY_BACKOFF_FACTOR = 0.2
+PRIVY_POOL_SIZE = 20
+
+# Longest a call to Privy can take, every attempt timing out between backoffs
+PRIVY_CALL_MAX_SECONDS = sum(PRIVY_REQUEST_TIMEOUT) * (
+    PRIVY_REQUEST_RETRIES + 1
+) + sum(PRIVY_RETRY_BACKOFF_FACTOR * 2**retry for retry in range(PRIVY_REQUEST_RETRIES))
+# Outlives the call to Privy and the inserts, or a second request would
+# call Privy again while the first one is still provisioning
+PRIVY_PROVISIONING_LOCK_SECONDS = math.ceil(PRIVY_CALL_MAX_SECONDS) + 5
+# How long the concurrent requests wait for the provisioning one
+PRIVY_PROVISIONING_TIMEOUT_SECONDS = 15
+
+
+@lru_cache(maxsize=None)
+def get_privy_session() -> requests.Session:
+    """
+    Process wide session, keeps the connections to Privy alive between calls.
+    """
+    session = requests.Session()
+    session.mount(
+        "https://",
+        HTTPAdapter(
+            pool_maxsize=PRIVY_POOL_SIZE,
+            max_retries=Retry(
+                total=PRIVY_REQUEST_RETRIES,
+                backoff_factor=PRIVY_RETRY_BACKOFF_FACTOR,
+                status_forcelist=[502, 503, 504],
+            ),
+        ),
+    )
+
+    return session
+
 
 def base64url_decode(input_str):
     padding = "=" * (4 - (len(input_str) % 4))
@@ -38,9 +90,8 @@ def deserialize_public_key(pem_data):
     return serialization.load_pem_public_key(pem_data.encode("utf-8"))
 
 
-@cache_function_in_seconds(3600)
-def get_jwk_keys():
-    response = requests.get(PUBLIC_KEY_URL)
+def fetch_jwk_keys():
+    response = get_privy_session().get(PUBLIC_KEY_URL, timeout=PRIVY_REQUEST_TIMEOUT)
 
     assert response.ok, "Unable to fetch public keys"
 
@@ -49,27 +100,103 @@ def get_jwk_keys():
     return jwks
 
 
-def get_public_key(token: str):
-    jwks = get_jwk_keys()
+@memoize(timeout=3600, stale_timeout=3600)
+def get_jwk_keys():
+    return fetch_jwk_keys()
 
-    token_kid = jwt.get_unverified_header(token)["kid"]
-    public_key_data = next(key for key in jwks["keys"] if key["kid"] == token_kid)
 
+def build_public_key(public_key_data: dict) -> ec.EllipticCurvePublicKey:
     x_int = int.from_bytes(base64url_decode(public_key_data["x"]), "big")
     y_int = int.from_bytes(base64url_decode(public_key_data["y"]), "big")
 
     public_numbers = ec.EllipticCurvePublicNumbers(x_int, y_int, ec.SECP256R1())
 
-    public_key = public_numbers.public_key()
+    return public_numbers.public_key()
+
+
+class JWKKeyStore:
+    """
+    Public keys of the Privy JWKS as ready to use key objects, by kid. They
+    are refreshed in the background once older than `refresh_seconds`, and
+    fetched from Privy right away only when a token names an unknown kid, at
+    most once per `unknown_kid_interval_seconds` so forged kids can't make
+    every request call Privy.
+    """
+
+    def __init__(self, refresh_seconds: int = 3600, unknown_kid_interval_seconds=30):
+        self.refresh_seconds = refresh_seconds
+        self.unknown_kid_interval_seconds = unknown_kid_interval_seconds
+        self.keys: dict[str, ec.EllipticCurvePublicKey] = {}
+        self.loaded_at = 0.0
+        self.unknown_kid_fetched_at = -unknown_kid_interval_seconds
+        self.lock = threading.Lock()
+        self.is_refreshing = False
+
+    def load(self, jwks: dict):
+        # Swapped at once, readers never lock
+        self.keys = {key["kid"]: build_public_key(key) for key in jwks["keys"]}
+        self.loaded_at = time.monotonic()
+
+    def get(self, kid: str) -> ec.EllipticCurvePublicKey:
+        public_key = self.keys.get(kid)
+
+        if public_key is not None:
+            if time.monotonic() - self.loaded_at > self.refresh_seconds:
+                self.refresh_in_background()
+
+            return public_key
+
+        with self.lock:
+            if not self.keys:
+                self.load(get_jwk_keys())
+
+            now = time.monotonic()
+
+            if (
+                kid not in self.keys
+                and now - self.unknown_kid_fetched_at
+                >= self.unknown_kid_interval_seconds
+            ):
+                # Rotated keys, skip the shared cache too
+                self.unknown_kid_fetched_at = now
+                self.load(fetch_jwk_keys())
+
+        if kid not in self.keys:
+            raise jwt.InvalidTokenError(f"Unknown key id {kid}")
+
+        return self.keys[kid]
+
+    def refresh_in_background(self):
+        with self.lock:
+            if self.is_refreshing:
+                return
 
-    return serialize_public_key(public_key)
+            self.is_refreshing = True
+
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def refresh(self):
+        try:
+            self.load(get_jwk_keys())
+        except Exception:
+            logger.exception("Failed to refresh the Privy public keys")
+        finally:
+            self.is_refreshing = False
+
+
+jwk_key_store = JWKKeyStore()
+
+
+def get_public_key(token: str) -> ec.EllipticCurvePublicKey:
+    return jwk_key_store.get(jwt.get_unverified_header(token)["kid"])
 
 
 def get_privy_user_by_id(privy_id: str):
-    response = requests.get(
+    response = get_privy_session().get(
         f"https://auth.privy.io/api/v1/users/{privy_id}",
         auth=(settings.PRIVY_APP_ID, settings.PRIVY_APP_SECRET),
         headers={"privy-app-id": settings.PRIVY_APP_ID},
+        timeout=PRIVY_REQUEST_TIMEOUT,
     )
 
     assert response.ok, "Unable to get privy user"
@@ -77,10 +204,125 @@ def get_privy_user_by_id(privy_id: str):
     return response.json()
 
 
+def get_privy_wallet_address(privy_data: dict) -> str:
+    wallet_address = first(
+        filter(
+            lambda account: account.get("imported") is False
+            and account["wallet_client"] == "privy",
+            privy_data["linked_accounts"],
+        )
+    )
+
+    return wallet_address["address"]
+
+
+def get_privy_username(privy_id: str, privy_data: dict) -> str:
+    return privy_id + " | " + str(privy_data["created_at"])
+
+
+def get_privy_profile_user(privy_id: str) -> User | None:
+    privy_user = (
+        PrivyProfile.objects.select_related("profile__user").filter(id=privy_id).first()
+    )
+
+    return privy_user.profile.user if privy_user else None
+
+
+def create_privy_user(privy_id: str, privy_data: dict | None = None) -> User:
+    """
+    Creates the user, profile and privy profile of a privy id. Without the
+    privy data the profile is provisional, it has no wallet address until
+    `enrich_privy_profile` fills it in.
+    """
+    if privy_data is None:
+        username = privy_id
+        wallet_address = None
+    else:
+        username = get_privy_username(privy_id, privy_data)
+        wallet_address = get_privy_wallet_address(privy_data)
+
+    with transaction.atomic():
+        user = User.objects.create(username=username)
+
+        user_profile = UserProfile.objects.create(
+            wallet_address=wallet_address,
+            user=user,
+            username=f"User {user.pk}",
+        )
+
+        PrivyProfile.objects.create(profile=user_profile, id=privy_id)
+
+    return user
+
+
+def wait_for_privy_user(privy_id: str) -> User:
+    deadline = time.monotonic() + PRIVY_PROVISIONING_TIMEOUT_SECONDS
+
+    while time.monotonic() < deadline:
+        user = get_privy_profile_user(privy_id)
+
+        if user is not None:
+            return user
+
+        time.sleep(0.1)
+
+    raise AuthenticationFailed("User is being provisioned, try again")
+
+
+def provision_privy_user(privy_id: str) -> User:
+    """
+    First login of a privy id. A single request per privy id, across the
+    processes, calls Privy and creates the user, the concurrent ones (the
+    other tabs of a new user) wait for it instead of calling Privy again
+    and racing on the inserts.
+    """
+    lock_id = f"privy_provisioning_{privy_id}"
+
+    with memcache_lock(
+        lock_id, os.getpid(), lock_expire=PRIVY_PROVISIONING_LOCK_SECONDS
+    ) as acquired:
+        if not acquired:
+            return wait_for_privy_user(privy_id)
+
+        # Finished by someone else right before we took the lock
+        user = get_privy_profile_user(privy_id)
+
+        if user is not None:
+            return user
+
+        is_provisional = settings.PRIVY_ASYNC_PROVISIONING
+
+        try:
+            user = create_privy_user(
+                privy_id, None if is_provisional else get_privy_user_by_id(privy_id)
+            )
+        except IntegrityError:
+            user = get_privy_profile_user(privy_id)
+
+            if user is None:
+                raise
+
+            return user
+
+        if is_provisional:
+            transaction.on_commit(
+                lambda: current_app.send_task(
+                    "authentication.tasks.enrich_privy_profile", args=[privy_id]
+                )
+            )
+
+        return user
+
+
 class PrivyJWTAuthentication(BaseAuthentication):
     def resolve_from_token(self, token: str):
+        user = verified_token_cache.get(token)
+
+        if user is not None:
+            return (user, token)
+
         try:
-            public_key = deserialize_public_key(get_public_key(token))
+            public_key = get_public_key(token)
 
             payload = jwt.decode(
                 token,
@@ -94,32 +336,8 @@ class PrivyJWTAuthentication(BaseAuthentication):
             if not user_id:
                 raise AuthenticationFailed("User not found in token")
 
-            privy_user = PrivyProfile.objects.filter(id=user_id).first()
-
-            if privy_user:
-                return (privy_user.profile.user, token)
-
-            privy_data = get_privy_user_by_id(user_id)
-
-            wallet_address = first(
-                filter(
-                    lambda account: account.get("imported") is False
-                    and account["wallet_client"] == "privy",
-                    privy_data["linked_accounts"],
-                )
-            )
-
-            user = User.objects.create(
-                username=user_id + " | " + str(privy_data["created_at"])
-            )
-
-            user_profile = UserProfile.objects.create(
-                wallet_address=wallet_address["address"],
-                user=user,
-                username=f"User {user.pk}",
-            )
-
-            privy_user = PrivyProfile.objects.create(profile=user_profile, id=user_id)
+            user = get_privy_profile_user(user_id) or provision_privy_user(user_id)
+            self.cache_verified_token(token, user, payload)
 
             return (user, token)
 
@@ -130,6 +348,10 @@ class PrivyJWTAuthentication(BaseAuthentication):
         except Exception as e:
             raise AuthenticationFailed(f"Error during authentication: {str(e)}")
 
+    def cache_verified_token(self, token: str, user: User, payload: dict):
+        if payload.get("exp"):
+            verified_token_cache.set(token, user, payload["exp"])
+
     def authenticate(self, request):
         auth_header = request.headers.get("Authorization")
         if not auth_header:
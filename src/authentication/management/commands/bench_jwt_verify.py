@@ -0,0 +1,99 @@
+import base64
+import time
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec
+from django.core.management.base import BaseCommand
+
+from authentication.auth import (
+    JWKKeyStore,
+    build_public_key,
+    deserialize_public_key,
+    serialize_public_key,
+)
+
+
+def base64url_encode(value: int) -> str:
+    return base64.urlsafe_b64encode(value.to_bytes(32, "big")).decode().rstrip("=")
+
+
+def build_jwks(private_key: ec.EllipticCurvePrivateKey, kid: str) -> dict:
+    public_numbers = private_key.public_key().public_numbers()
+
+    return {
+        "keys": [
+            {
+                "kty": "EC",
+                "crv": "P-256",
+                "alg": "ES256",
+                "use": "sig",
+                "kid": kid,
+                "x": base64url_encode(public_numbers.x),
+                "y": base64url_encode(public_numbers.y),
+            }
+        ]
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures ES256 token verifications per second on a single core, "
+        "rebuilding the public key through PEM on every token as before and "
+        "reading it from the key store."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        kid = "bench"
+
+        private_key = ec.generate_private_key(ec.SECP256R1())
+        jwks = build_jwks(private_key, kid)
+        token = jwt.encode(
+            {"sub": "did:privy:bench", "iss": "privy.io", "aud": "bench"},
+            private_key,
+            algorithm="ES256",
+            headers={"kid": kid},
+        )
+
+        key_store = JWKKeyStore()
+        key_store.load(jwks)
+
+        def pem_public_key(token):
+            token_kid = jwt.get_unverified_header(token)["kid"]
+            public_key_data = next(
+                key for key in jwks["keys"] if key["kid"] == token_kid
+            )
+
+            return deserialize_public_key(
+                serialize_public_key(build_public_key(public_key_data))
+            )
+
+        def stored_public_key(token):
+            return key_store.get(jwt.get_unverified_header(token)["kid"])
+
+        baseline = None
+
+        for name, get_public_key in {
+            "PEM per token": pem_public_key,
+            "JWKKeyStore": stored_public_key,
+        }.items():
+            started_at = time.perf_counter()
+
+            for _ in range(iterations):
+                jwt.decode(
+                    token,
+                    get_public_key(token),
+                    issuer="privy.io",
+                    audience="bench",
+                    algorithms=["ES256"],
+                )
+
+            rate = iterations / (time.perf_counter() - started_at)
+            baseline = baseline or rate
+
+            self.stdout.write(
+                f"  {name:<16} {rate:>10,.0f} tokens/s  {rate / baseline:.2f}x"
+            )
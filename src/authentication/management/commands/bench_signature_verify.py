@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+from core.signatures import SignatureVerifier
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures wallet signature recoveries per second with an increasing "
+        "number of worker processes, 0 recovering them in the calling threads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--signatures", type=int, default=2_000)
+        parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+
+    def handle(self, *args, **options):
+        count = options["signatures"]
+
+        account = Account.create()
+        message = "Sign in with this wallet address to authenticate."
+        signature = account.sign_message(encode_defunct(text=message)).signature.hex()
+
+        for workers in options["workers"]:
+            verifier = SignatureVerifier(
+                max_workers=workers, max_pending=count, timeout_seconds=60
+            )
+
+            # Warms the pool up, spawning the workers is not measured
+            verifier.recover_message_signer(message, signature)
+
+            started_at = time.perf_counter()
+
+            with ThreadPoolExecutor(max_workers=max(workers, 1) * 4) as requests:
+                signers = list(
+                    requests.map(
+                        lambda _: verifier.recover_message_signer(message, signature),
+                        range(count),
+                    )
+                )
+
+            rate = count / (time.perf_counter() - started_at)
+            verifier.shutdown()
+
+            assert set(signers) == {account.address}, "Recovered a wrong signer"
+
+            self.stdout.write(f"  {workers} workers {rate:>10,.0f} signatures/s")
@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def delete_remove_old_nonces_task(apps, schema_editor):
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    PeriodicTasks = apps.get_model("django_celery_beat", "PeriodicTasks")
+
+    # The nonces expire in redis on their own now
+    deleted, _ = PeriodicTask.objects.filter(
+        task="authentication.tasks.remove_old_nonces"
+    ).delete()
+
+    # Tells the beat scheduler to reload its schedule
+    if deleted:
+        PeriodicTasks.objects.update_or_create(
+            ident=1, defaults={"last_update": timezone.now()}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0007_privyprofile"),
+        ("django_celery_beat", "0019_alter_periodictasks_options"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_remove_old_nonces_task, migrations.RunPython.noop),
+    ]
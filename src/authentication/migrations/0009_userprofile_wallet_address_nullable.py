@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0008_delete_remove_old_nonces_task'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='wallet_address',
+            field=models.CharField(blank=True, db_index=True, max_length=512, null=True, unique=True),
+        ),
+    ]
@@ -23,7 +23,10 @@ class UserProfile(models.Model):
         blank=True,
         unique=True,
     )
-    wallet_address = models.CharField(max_length=512, db_index=True, unique=True)
+    # Empty while a privy profile is provisional, until it is enriched
+    wallet_address = models.CharField(
+        max_length=512, db_index=True, unique=True, null=True, blank=True
+    )
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     image = CloudflareImagesField(variant="public", null=True, blank=True)
 
@@ -38,7 +41,7 @@ class UserProfile(models.Model):
         ]
 
     def __str__(self) -> str:
-        return self.username or self.wallet_address
+        return self.username or self.wallet_address or ""
 
 
 class PrivyProfile(models.Model):
@@ -1,9 +1,60 @@
 from typing import Any, Dict
+import json
 import os
 from datetime import timedelta
 from django.utils import timezone
 from siwe import SiweMessage, generate_nonce, ISO8601Datetime
+from siwe.siwe import datetime_from_iso8601_string
 from eth_utils import to_checksum_address, is_checksum_address
+from core.signatures import SignatureVerifierBusy, signature_verifier
+from witswin.caching import get_redis_connection
+
+
+class NonceStore:
+    """
+    Pending SIWE messages by address, in redis so any process can verify the
+    messages created by the others. Each one expires with its message and is
+    taken out atomically on verify, so a nonce is never accepted twice.
+    Keeps the get, pop and item assignment of the previous in-process dict.
+    """
+
+    key_prefix = "siwe_nonce_"
+
+    def __init__(self):
+        self.redis = get_redis_connection()
+
+    def get_key(self, address: str) -> str:
+        return f"{self.key_prefix}{address}"
+
+    def encode(self, nonce: str, message: SiweMessage) -> str:
+        return json.dumps({"nonce": nonce, "message": message.prepare_message()})
+
+    def decode(self, value: bytes) -> tuple[str, SiweMessage]:
+        data = json.loads(value)
+
+        return data["nonce"], SiweMessage.from_message(message=data["message"])
+
+    def __setitem__(self, address: str, value: tuple[str, SiweMessage]):
+        nonce, message = value
+        expires_in = (
+            datetime_from_iso8601_string(message.expiration_time) - timezone.now()
+        )
+
+        self.redis.set(
+            self.get_key(address),
+            self.encode(nonce, message),
+            ex=max(int(expires_in.total_seconds()), 1),
+        )
+
+    def get(self, address: str, default=None):
+        value = self.redis.get(self.get_key(address))
+
+        return default if value is None else self.decode(value)
+
+    def pop(self, address: str, default=None):
+        value = self.redis.getdel(self.get_key(address))
+
+        return default if value is None else self.decode(value)
 
 
 class SignWithEthereum:
@@ -17,7 +68,7 @@ class SignWithEthereum:
     def __init__(self):
 
         if not hasattr(self, "_initialized"):
-            self.nonces: Dict[str, SiweMessage] = {}  # address : [nonce,message]
+            self.nonces = NonceStore()  # address : [nonce,message]
             self._initialized = True
 
             self.domain = os.getenv("DOMAIN")
@@ -104,13 +155,21 @@ class SignWithEthereum:
         Returns:
             bool: True if the message is verified and nonce matches, False otherwise.
         """
-        if address not in self.nonces:
+        # Taken out in the same step, a concurrent verify can't reuse it
+        entry = self.nonces.pop(address)
+
+        if entry is None:
             return False
 
-        stored_nonce, message = self.nonces.pop(address)
+        stored_nonce, message = entry
 
         try:
-            message.verify(signature)
-            return stored_nonce == nonce
-        except Exception:
-            return False
+            is_verified = signature_verifier.verify_siwe_signature(
+                message.prepare_message(), signature
+            )
+        except SignatureVerifierBusy:
+            # Not checked, the client may retry with the same nonce
+            self.nonces[address] = entry
+            raise
+
+        return is_verified and stored_nonce == nonce
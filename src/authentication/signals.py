@@ -1,16 +1,19 @@
-from django.db.models.signals import post_migrate
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-@receiver(post_migrate)
-def create_periodic_task(sender, **kwargs):
-    if sender.name == 'authentication':  # Only run for our app
-        from django_celery_beat.models import PeriodicTask, IntervalSchedule
-        schedule, _ = IntervalSchedule.objects.get_or_create(
-            every=5,
-            period=IntervalSchedule.MINUTES,
-        )
-        PeriodicTask.objects.get_or_create(
-            task='authentication.tasks.remove_old_nonces',
-            name='Remove old nonces every 10 minutes',
-            interval=schedule,
-        )
\ No newline at end of file
+from authentication.models import UserProfile
+from authentication.token_cache import verified_token_cache
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_verified_tokens(sender, instance: User | UserProfile, **kwargs):
+    # The cached tokens carry the user and its profile, deactivated or
+    # changed users have to be verified again
+    user_id = instance.pk if sender is User else instance.user_id
+
+    transaction.on_commit(lambda: verified_token_cache.invalidate_user(user_id))
@@ -1,23 +1,24 @@
-from django.utils import timezone
 from celery import shared_task
-from authentication.sign_with_ethereum import SignWithEthereum
+from authentication.auth import (
+    get_privy_user_by_id,
+    get_privy_username,
+    get_privy_wallet_address,
+)
+from authentication.models import PrivyProfile
 
 
-@shared_task
-def remove_old_nonces() -> None:
+@shared_task(autoretry_for=(Exception,), retry_backoff=True, max_retries=5)
+def enrich_privy_profile(privy_id: str) -> None:
     """
-    Celery task to remove expired nonce entries from the SignWithEthereum instance.
-    Nonces are considered expired if their expiration_time is before the current time.
+    Replaces the placeholders of a provisional profile with the wallet
+    address and creation date of the privy user.
     """
-    sign = SignWithEthereum()  # Get the singleton instance
-    current_time = timezone.now()  # Get the current time (timezone-aware)
+    privy_user = PrivyProfile.objects.select_related("profile__user").get(id=privy_id)
+    privy_data = get_privy_user_by_id(privy_id)
 
-    expired_addresses = [
-        address
-        for address, (_, message) in sign.nonces.items()
-        if message.expiration_time.to_datetime() < current_time
-    ]
+    user_profile = privy_user.profile
+    user_profile.wallet_address = get_privy_wallet_address(privy_data)
+    user_profile.save(update_fields=["wallet_address"])
 
-    # Remove expired nonces from the dictionary
-    for address in expired_addresses:
-        del sign.nonces[address]
+    user_profile.user.username = get_privy_username(privy_id, privy_data)
+    user_profile.user.save(update_fields=["username"])
@@ -1,22 +1,41 @@
 import os
+import time
 import uuid
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec
+from django.core.cache import cache
 from django.test import RequestFactory, TestCase
 
 # Create your tests here.
 from django.test import TestCase
 from unittest.mock import patch
-from siwe import SiweMessage
+from datetime import timedelta
+from django.utils import timezone
+from siwe import ISO8601Datetime, SiweMessage
 from web3 import Web3
+from eth_account import Account
 from eth_account.messages import encode_defunct
 from dotenv import load_dotenv
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from authentication.auth import (
+    JWKKeyStore,
+    PrivyJWTAuthentication,
+    create_privy_user,
+    get_public_key,
+    provision_privy_user,
+)
+from authentication.tasks import enrich_privy_profile
+from core.signatures import SignatureVerifier, SignatureVerifierBusy
+from authentication.management.commands.bench_jwt_verify import build_jwks
 from authentication.models import UserProfile
+from authentication.token_cache import VerifiedTokenCache, verified_token_cache
 from authentication.views import VerifyWalletView
 
-from .sign_with_ethereum import SignWithEthereum
+from .sign_with_ethereum import NonceStore, SignWithEthereum
 from django.contrib.auth.models import User
 
 
@@ -65,7 +84,8 @@ class SignWitEthereumTests(TestCase):
                 self.assertIsNotNone(nonce)
                 self.assertEqual(s_message.prepare_message(), message)
 
-        self.assertGreaterEqual(len(SignWithEthereum().nonces), len(addresses))
+        for address in addresses:
+            self.assertIsNotNone(SignWithEthereum().nonces.get(self.to_eip55(address)))
 
     def test_verify_message(self):
         load_dotenv()
@@ -221,3 +241,264 @@ class VerifyWalletViewTestCase(TestCase):
         self.assertTrue(response.cookies["userToken"]["secure"])
         self.assertEqual(response.cookies["userToken"]["domain"], ".wits.win")
         self.assertEqual(response.cookies["userToken"]["samesite"], "None")
+
+
+class VerifiedTokenCacheTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="privy_user")
+        UserProfile.objects.create(user=self.user, wallet_address="0x1")
+        self.user = User.objects.select_related("profile").get(pk=self.user.pk)
+        self.token = f"header.{uuid.uuid4().hex}.signature"
+
+    def test_shared_between_processes(self):
+        VerifiedTokenCache().set(self.token, self.user, time.time() + 60)
+
+        with self.assertNumQueries(0):
+            user = VerifiedTokenCache().get(self.token)
+
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(user.profile.wallet_address, "0x1")
+
+    def test_users_are_not_shared_between_requests(self):
+        token_cache = VerifiedTokenCache()
+        token_cache.set(self.token, self.user, time.time() + 60)
+
+        user = token_cache.get(self.token)
+        user.profile.username = "changed"
+
+        self.assertIsNot(user, token_cache.get(self.token))
+        self.assertIsNone(token_cache.get(self.token).profile.username)
+
+        self.user.profile.username = "changed"
+
+        self.assertIsNone(
+            token_cache.get(self.token).profile.username, "The caller's user is copied"
+        )
+
+    def test_expired_tokens_are_not_cached(self):
+        token_cache = VerifiedTokenCache()
+        token_cache.set(self.token, self.user, time.time() - 1)
+
+        self.assertIsNone(token_cache.get(self.token))
+
+    def test_invalidate_user(self):
+        token_cache = VerifiedTokenCache()
+        token_cache.set(self.token, self.user, time.time() + 60)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertIsNone(VerifiedTokenCache().get(self.token))
+
+        token_cache.invalidate_user(self.user.pk)
+
+        self.assertIsNone(token_cache.get(self.token))
+
+    @patch("authentication.auth.get_public_key")
+    def test_resolve_cached_token(self, mock_get_public_key):
+        verified_token_cache.set(self.token, self.user, time.time() + 60)
+
+        with self.assertNumQueries(0):
+            user, token = PrivyJWTAuthentication().resolve_from_token(self.token)
+
+        self.assertEqual(user.pk, self.user.pk)
+        mock_get_public_key.assert_not_called()
+
+
+class JWKKeyStoreTestCase(TestCase):
+    def setUp(self):
+        self.private_key = ec.generate_private_key(ec.SECP256R1())
+        self.rotated_private_key = ec.generate_private_key(ec.SECP256R1())
+
+    @patch("authentication.auth.fetch_jwk_keys")
+    @patch("authentication.auth.get_jwk_keys")
+    def test_refetch_on_unknown_kid(self, mock_get_jwk_keys, mock_fetch_jwk_keys):
+        mock_get_jwk_keys.return_value = build_jwks(self.private_key, "current")
+        mock_fetch_jwk_keys.return_value = build_jwks(
+            self.rotated_private_key, "rotated"
+        )
+        key_store = JWKKeyStore()
+
+        self.assertEqual(
+            key_store.get("current").public_numbers(),
+            self.private_key.public_key().public_numbers(),
+        )
+        mock_fetch_jwk_keys.assert_not_called()
+
+        self.assertEqual(
+            key_store.get("rotated").public_numbers(),
+            self.rotated_private_key.public_key().public_numbers(),
+        )
+
+        with self.assertRaises(jwt.InvalidTokenError):
+            key_store.get("forged")
+
+        self.assertEqual(
+            mock_fetch_jwk_keys.call_count, 1, "Unknown kids are fetched once a while"
+        )
+
+    @patch("authentication.auth.get_jwk_keys")
+    def test_verify_with_stored_key(self, mock_get_jwk_keys):
+        mock_get_jwk_keys.return_value = build_jwks(self.private_key, "current")
+        token = jwt.encode(
+            {"sub": "did:privy:test"},
+            self.private_key,
+            algorithm="ES256",
+            headers={"kid": "current"},
+        )
+
+        with patch("authentication.auth.jwk_key_store", JWKKeyStore()):
+            payload = jwt.decode(token, get_public_key(token), algorithms=["ES256"])
+
+        self.assertEqual(payload["sub"], "did:privy:test")
+
+
+PRIVY_USER_DATA = {
+    "created_at": 1729230000,
+    "linked_accounts": [
+        {"type": "email", "address": "player@wits.win"},
+        {
+            "type": "wallet",
+            "imported": False,
+            "wallet_client": "privy",
+            "address": "0xPrivyWallet",
+        },
+    ],
+}
+
+
+class PrivyProvisioningTestCase(TestCase):
+    privy_id = "did:privy:new_player"
+
+    @patch("authentication.auth.get_privy_user_by_id", return_value=PRIVY_USER_DATA)
+    def test_provision_once(self, mock_get_privy_user_by_id):
+        user = provision_privy_user(self.privy_id)
+
+        self.assertEqual(user.profile.wallet_address, "0xPrivyWallet")
+        self.assertEqual(provision_privy_user(self.privy_id).pk, user.pk)
+        mock_get_privy_user_by_id.assert_called_once_with(self.privy_id)
+
+    @patch("authentication.auth.get_privy_user_by_id")
+    def test_wait_for_concurrent_provisioning(self, mock_get_privy_user_by_id):
+        user = create_privy_user(self.privy_id, PRIVY_USER_DATA)
+        cache.add(f"privy_provisioning_{self.privy_id}", "other process")
+
+        self.assertEqual(provision_privy_user(self.privy_id).pk, user.pk)
+        mock_get_privy_user_by_id.assert_not_called()
+
+        cache.delete(f"privy_provisioning_{self.privy_id}")
+
+    @patch("authentication.tasks.get_privy_user_by_id", return_value=PRIVY_USER_DATA)
+    @patch("authentication.auth.get_privy_user_by_id")
+    def test_async_provisioning(self, mock_get_privy_user_by_id, _):
+        with self.settings(PRIVY_ASYNC_PROVISIONING=True), patch(
+            "authentication.auth.current_app.send_task"
+        ) as mock_send_task, self.captureOnCommitCallbacks(execute=True):
+            user = provision_privy_user(self.privy_id)
+
+        self.assertIsNone(user.profile.wallet_address, "Provisional")
+        mock_get_privy_user_by_id.assert_not_called()
+        mock_send_task.assert_called_once_with(
+            "authentication.tasks.enrich_privy_profile", args=[self.privy_id]
+        )
+
+        enrich_privy_profile(self.privy_id)
+
+        user.profile.refresh_from_db()
+
+        self.assertEqual(user.profile.wallet_address, "0xPrivyWallet")
+
+
+class NonceStoreTestCase(TestCase):
+    address = "0x742d35Cc6634C0532925a3b844Bc454e4438f44e"
+
+    def setUp(self):
+        self.nonces = NonceStore()
+        self.message = SiweMessage(
+            domain="example.com",
+            address=self.address,
+            uri="https://example.com",
+            version="1",
+            chain_id=1,
+            issued_at=ISO8601Datetime.from_datetime(timezone.now()),
+            expiration_time=ISO8601Datetime.from_datetime(
+                timezone.now() + timedelta(minutes=10)
+            ),
+            nonce="abcdefgh12345678",
+        )
+
+    def test_expires_with_message(self):
+        self.nonces[self.address] = ("abcdefgh12345678", self.message)
+
+        nonce, message = self.nonces.get(self.address)
+
+        self.assertEqual(nonce, "abcdefgh12345678")
+        self.assertEqual(message.prepare_message(), self.message.prepare_message())
+        self.assertTrue(
+            0 < self.nonces.redis.ttl(self.nonces.get_key(self.address)) <= 600
+        )
+
+    def test_pop_once(self):
+        self.nonces[self.address] = ("abcdefgh12345678", self.message)
+
+        self.assertIsNotNone(self.nonces.pop(self.address))
+        self.assertIsNone(self.nonces.pop(self.address), "A nonce is used once")
+        self.assertIsNone(self.nonces.get(self.address))
+
+
+class SignatureVerifierTestCase(TestCase):
+    message = "Sign in with this wallet address to authenticate."
+
+    def setUp(self):
+        self.account = Account.create()
+        self.signature = self.account.sign_message(
+            encode_defunct(text=self.message)
+        ).signature.hex()
+
+    def test_recover_in_worker_process(self):
+        verifier = SignatureVerifier(max_workers=1, max_pending=4, timeout_seconds=60)
+
+        try:
+            signer = verifier.recover_message_signer(self.message, self.signature)
+        finally:
+            verifier.shutdown()
+
+        self.assertEqual(signer, self.account.address)
+
+    def test_reject_over_max_pending(self):
+        verifier = SignatureVerifier(max_workers=0, max_pending=1)
+
+        self.assertEqual(
+            verifier.recover_message_signer(self.message, self.signature),
+            self.account.address,
+        )
+
+        verifier.pending = 1
+
+        with self.assertRaises(SignatureVerifierBusy) as context:
+            verifier.recover_message_signer(self.message, self.signature)
+
+        self.assertEqual(context.exception.status_code, 429)
+        self.assertEqual(context.exception.wait, 1)
+
+    def test_cancel_on_timeout(self):
+        verifier = SignatureVerifier(max_workers=1, max_pending=10, timeout_seconds=0.1)
+
+        try:
+            for _ in range(5):
+                with self.assertRaises(SignatureVerifierBusy):
+                    verifier.run(time.sleep, 1)
+
+            # The queued ones are cancelled, those handed to the worker still count
+            self.assertLess(verifier.pending, 5)
+            self.assertGreater(verifier.pending, 0)
+
+            deadline = time.monotonic() + 30
+
+            while verifier.pending and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+            self.assertEqual(verifier.pending, 0, "Released once the pool is done")
+        finally:
+            verifier.shutdown()
@@ -0,0 +1,112 @@
+import copy
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from witswin.caching import get_redis_connection
+
+
+class VerifiedTokenCache:
+    """
+    Users of the tokens verified recently, by token digest, until the tokens
+    expire. Looked up in the process first and in the shared cache next, so a
+    returning player is authenticated without checking the signature or
+    querying the database again.
+
+    `invalidate_user` drops the tokens of a user everywhere in the shared
+    cache and in this process, the other processes keep theirs for at most
+    `local_timeout_seconds`.
+
+    The users kept in the process are never handed out, every request gets
+    its own copy of the user and its profile to change.
+    """
+
+    def __init__(self, local_size: int = 10_000, local_timeout_seconds: int = 30):
+        self.local_size = local_size
+        self.local_timeout_seconds = local_timeout_seconds
+        self.local_entries: OrderedDict[str, tuple[User, float]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_digest(self, token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get_key(self, digest: str) -> str:
+        return f"verified_token_{digest}"
+
+    def get_user_key(self, user_id: int) -> str:
+        return f"verified_tokens_user_{user_id}"
+
+    def get(self, token: str) -> User | None:
+        digest = self.get_digest(token)
+        now = time.time()
+
+        with self.lock:
+            entry = self.local_entries.get(digest)
+
+            if entry is not None:
+                if entry[1] > now:
+                    self.local_entries.move_to_end(digest)
+                    return copy.deepcopy(entry[0])
+
+                del self.local_entries[digest]
+
+        entry = cache.get(self.get_key(digest))
+
+        if entry is None or entry[1] <= now:
+            return None
+
+        user, expires_at = entry
+        self.set_local(digest, user, expires_at, now)
+
+        return user
+
+    def set(self, token: str, user: User, expires_at: float):
+        now = time.time()
+
+        if expires_at <= now:
+            return
+
+        digest = self.get_digest(token)
+        timeout = math.ceil(expires_at - now)
+
+        cache.set(self.get_key(digest), (user, expires_at), timeout=timeout)
+
+        # Digests of the user, to find its tokens again on invalidation
+        pipe = get_redis_connection().pipeline()
+        pipe.sadd(self.get_user_key(user.pk), digest)
+        pipe.expire(self.get_user_key(user.pk), timeout)
+        pipe.execute()
+
+        self.set_local(digest, user, expires_at, now)
+
+    def set_local(self, digest: str, user: User, expires_at: float, now: float):
+        with self.lock:
+            self.local_entries[digest] = (
+                copy.deepcopy(user),
+                min(expires_at, now + self.local_timeout_seconds),
+            )
+            self.local_entries.move_to_end(digest)
+
+            while len(self.local_entries) > self.local_size:
+                self.local_entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        redis = get_redis_connection()
+        user_key = self.get_user_key(user_id)
+
+        digests = [digest.decode() for digest in redis.smembers(user_key)]
+
+        cache.delete_many([self.get_key(digest) for digest in digests])
+        redis.delete(user_key)
+
+        with self.lock:
+            for digest, (user, _) in list(self.local_entries.items()):
+                if user.pk == user_id:
+                    del self.local_entries[digest]
+
+
+verified_token_cache = VerifiedTokenCache()
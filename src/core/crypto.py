@@ -3,8 +3,21 @@ import json
 from eth_account import Account
 from eth_account.messages import encode_defunct
 from django.utils import timezone
+from siwe import SiweMessage
 
 
+def recover_message_signer(message: str, signature: str) -> str:
+  return Account.recover_message(encode_defunct(text=message), signature=signature)
+
+
+def verify_siwe_signature(message: str, signature: str) -> bool:
+  try:
+    SiweMessage.from_message(message=message).verify(signature)
+  except Exception:
+    return False
+
+  return True
+
 
 class Crypto:
   def __init__(self, minutes_to_verify=None) -> None:
@@ -18,8 +31,10 @@ class Crypto:
 
 
   def verify_signature(self, address, message, signature):
-        digest = encode_defunct(text=message)
-        signer = Account.recover_message(digest, signature=signature)
+        # Imported here, core.signatures imports the worker functions above
+        from core.signatures import signature_verifier
+
+        signer = signature_verifier.recover_message_signer(message, signature)
 
         now = timezone.now()
 
@@ -0,0 +1,119 @@
+"""
+Offloads the secp256k1 signature recoveries of the wallet logins to a pool
+of worker processes
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from rest_framework.exceptions import Throttled
+
+# Imported by the workers, kept apart from the django settings
+from core.crypto import recover_message_signer, verify_siwe_signature
+
+
+class SignatureVerifierBusy(Throttled):
+    default_detail = "Too many logins at once, try again shortly."
+    default_code = "signature_verifier_busy"
+
+
+class SignatureVerifier:
+    """
+    Runs the signature recoveries on a bounded pool of worker processes, a
+    recovery would otherwise hold the request thread (and the event loop
+    under daphne) for milliseconds of CPU. Beyond `max_pending` recoveries
+    queued or running in this process new ones are rejected right away with
+    SignatureVerifierBusy (429 with a Retry-After) instead of piling up.
+
+    With `max_workers` 0 the recoveries run inline.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        max_pending: int | None = None,
+        timeout_seconds: float | None = None,
+    ):
+        self.max_workers = (
+            settings.SIGNATURE_WORKERS if max_workers is None else max_workers
+        )
+        self.max_pending = max_pending or settings.SIGNATURE_MAX_PENDING
+        self.timeout_seconds = timeout_seconds or settings.SIGNATURE_TIMEOUT_SECONDS
+        self.executor: ProcessPoolExecutor | None = None
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                # Forking a process running threads (daphne, the db pool) is unsafe
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+
+            return self.executor
+
+    def release(self, future=None):
+        with self.lock:
+            self.pending -= 1
+
+    def run(self, func, *args):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise SignatureVerifierBusy(wait=1)
+
+            self.pending += 1
+
+        if self.max_workers == 0:
+            try:
+                return func(*args)
+            finally:
+                self.release()
+
+        try:
+            future = self.get_executor().submit(func, *args)
+        except BrokenProcessPool:
+            self.release()
+            self.reset_executor()
+
+            raise SignatureVerifierBusy(wait=1)
+
+        # Pending until the pool is done with it, not until we stop waiting
+        future.add_done_callback(self.release)
+
+        try:
+            return future.result(timeout=self.timeout_seconds)
+        except TimeoutError:
+            # Drops it from the queue, a running recovery can't be cancelled
+            future.cancel()
+
+            raise SignatureVerifierBusy(wait=1)
+        except BrokenProcessPool:
+            self.reset_executor()
+
+            raise SignatureVerifierBusy(wait=1)
+
+    def reset_executor(self):
+        # A worker died, start a new pool for the next ones
+        with self.lock:
+            self.executor = None
+
+    def recover_message_signer(self, message: str, signature: str) -> str:
+        return self.run(recover_message_signer, message, signature)
+
+    def verify_siwe_signature(self, message: str, signature: str) -> bool:
+        return self.run(verify_siwe_signature, message, signature)
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+
+        if executor is not None:
+            executor.shutdown()
+
+
+signature_verifier = SignatureVerifier()
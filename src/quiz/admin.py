@@ -10,6 +10,7 @@ from quiz.models import (
     Hint,
     HintAchivement,
     CompetitionHint,
+    CompetitionRoundStat,
     UserCompetitionHint,
 )
 
@@ -102,4 +103,5 @@ admin.site.register(Hint)
 admin.site.register(HintAchivement)
 
 admin.site.register(UserCompetitionHint)
+admin.site.register(CompetitionRoundStat)
 admin.site.register(CompetitionHint)
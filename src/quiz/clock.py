@@ -0,0 +1,116 @@
+import math
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from django.utils import timezone
+
+
+# Seconds before the end of the answer window the correct choice is revealed
+ANSWER_REVEAL_LEAD_SECONDS = 2
+
+
+@dataclass(frozen=True)
+class CompetitionClock:
+    """
+    Timeline of a competition. Every round is `question_time_seconds` of
+    answering followed by `rest_time_seconds` of rest, starting at `start_at`.
+    All answers are plain arithmetic over the four inputs, no queries.
+    """
+
+    start_at: datetime
+    question_time_seconds: int
+    rest_time_seconds: int
+    question_count: int
+
+    @classmethod
+    def for_competition(cls, competition) -> "CompetitionClock":
+        start_at = competition.start_at
+
+        if timezone.is_naive(start_at):
+            start_at = timezone.make_aware(start_at, timezone.get_current_timezone())
+
+        return get_competition_clock(
+            start_at,
+            competition.question_time_seconds,
+            competition.rest_time_seconds,
+            competition.question_count,
+        )
+
+    @property
+    def round_seconds(self) -> int:
+        return self.question_time_seconds + self.rest_time_seconds
+
+    @property
+    def end_at(self) -> datetime:
+        return self.start_at + timedelta(
+            seconds=self.question_count * self.round_seconds
+        )
+
+    def elapsed_seconds(self, now: datetime | None = None) -> float:
+        return ((now or timezone.now()) - self.start_at).total_seconds()
+
+    def elapsed_rounds(self, now: datetime | None = None) -> int:
+        """
+        Rounds whose full answer and rest time has passed, not capped by the
+        question count.
+        """
+        return max(math.floor(self.elapsed_seconds(now) / self.round_seconds), 0)
+
+    def has_started(self, now: datetime | None = None) -> bool:
+        return self.start_at <= (now or timezone.now())
+
+    def get_state(self, now: datetime | None = None) -> int:
+        """
+        Number of the current question, 0 before the start. Stays on the last
+        question once the competition is over.
+        """
+        if not self.has_started(now):
+            return 0
+
+        return min(self.elapsed_rounds(now) + 1, self.question_count)
+
+    def round_start(self, number: int) -> datetime:
+        return self.start_at + timedelta(seconds=(number - 1) * self.round_seconds)
+
+    def round_deadline(self, number: int) -> datetime:
+        return self.round_start(number) + timedelta(
+            seconds=self.question_time_seconds
+        )
+
+    def answer_reveal_at(self, number: int) -> datetime:
+        return self.round_deadline(number) - timedelta(
+            seconds=ANSWER_REVEAL_LEAD_SECONDS
+        )
+
+    def is_in_progress(self, now: datetime | None = None) -> bool:
+        """
+        True from the start until the last answer window closes, the rest
+        after the last question is not part of the competition.
+        """
+        now = now or timezone.now()
+
+        return self.has_started(now) and (
+            self.end_at - timedelta(seconds=self.rest_time_seconds) >= now
+        )
+
+    def is_finished(self, now: datetime | None = None) -> bool:
+        now = now or timezone.now()
+
+        return not self.is_in_progress(now) and self.end_at <= now
+
+
+@lru_cache(maxsize=1024)
+def get_competition_clock(
+    start_at: datetime,
+    question_time_seconds: int,
+    rest_time_seconds: int,
+    question_count: int,
+) -> CompetitionClock:
+    """
+    Per process cache of the clocks, keyed by the timeline inputs so an edited
+    competition gets a fresh clock.
+    """
+    return CompetitionClock(
+        start_at, question_time_seconds, rest_time_seconds, question_count
+    )
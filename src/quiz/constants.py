@@ -1,2 +1,18 @@
 REST_BETWEEN_EACH_QUESTION_SECOND = 9
 ANSWER_TIME_SECOND = 14
+
+ANSWER_BUFFER_TIMEOUT_SECONDS = 5 * 60
+STATS_HINT_SNAPSHOT_SECONDS = 1
+ANSWER_FLUSH_CHUNK_SIZE = 1000
+ANSWER_LOG_MAX_LENGTH = 100_000
+ANSWER_LOG_TIMEOUT_SECONDS = 24 * 60 * 60
+SURVIVOR_SET_TIMEOUT_SECONDS = 24 * 60 * 60
+ENROLLMENT_COUNTS_WINDOW_SECONDS = 1
+QUIZ_LIST_CHANGELOG_SIZE = 100
+QUIZ_LIST_CACHE_TIMEOUT_SECONDS = 24 * 60 * 60
+HTTP_CACHE_MAX_AGE_SECONDS = 10
+QUIZ_SESSION_CACHE_TIMEOUT_SECONDS = 2
+WALLET_ENRICHMENT_ATTEMPTS = 5
+
+# Channel layer alias of the competition groups, see CHANNEL_LAYERS
+QUIZ_CHANNEL_LAYER = "quiz"
@@ -1,5 +1,6 @@
 import json
 from typing import Any, Type
+from urllib.parse import parse_qs
 from channels.generic.websocket import (
     AsyncJsonWebsocketConsumer,
 )
@@ -20,7 +21,10 @@ from quiz.utils import (
     is_user_eligible_to_participate,
 )
 from quiz.services.competition_service import CompetitionService
-from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+from quiz.services.quiz_list import QuizListSnapshot
+from quiz.services.session import QuizSession
+from quiz.encoders import get_ws_encoder
+from quiz.constants import QUIZ_CHANNEL_LAYER
 from djangorestframework_camel_case.util import underscoreize
 from .models import Competition, Question, Choice, UserCompetition, UserAnswer
 from django.core.cache import cache
@@ -51,7 +55,7 @@ class BaseJsonConsumer(AsyncJsonWebsocketConsumer):
 
     @classmethod
     async def encode_json(cls, content):
-        return CamelCaseJSONRenderer().render(content).decode("utf-8")
+        return get_ws_encoder().encode(content)
 
     @database_sync_to_async
     def resolve_user(self):
@@ -63,11 +67,16 @@ class BaseJsonConsumer(AsyncJsonWebsocketConsumer):
 
 class QuizListConsumer(BaseJsonConsumer):
     @database_sync_to_async
-    def get_quiz_list(self):
-        return CompetitionSerializer(
-            Competition.objects.filter(is_active=True).order_by("-created_at"),
-            many=True,
-        ).data
+    def get_quiz_list_message(self):
+        return QuizListSnapshot().get_message(self.get_client_version())
+
+    def get_client_version(self) -> int | None:
+        query_params = parse_qs(self.scope["query_string"].decode("utf-8"))
+
+        try:
+            return int(query_params["version"][0])
+        except (KeyError, ValueError):
+            return None
 
     @database_sync_to_async
     def get_enrollments_list(self):
@@ -92,32 +101,17 @@ class QuizListConsumer(BaseJsonConsumer):
             self.competition_group_name, self.channel_name
         )
 
-        await self.send_json(
-            {"type": "competition_list", "data": await self.get_quiz_list()}
-        )
+        await self.send(text_data=await self.get_quiz_list_message())
         await self.send_json(
             {"type": "user_enrolls", "data": await self.get_enrollments_list()}
         )
 
-    @database_sync_to_async
-    def resolve_competition(self, pk):
-        competition = Competition.objects.get(pk=pk)
-
-        return CompetitionSerializer(instance=competition).data
-
     async def update_competition_data(self, event):
-        pk = event["data"]
-
-        data = await self.resolve_competition(pk)
-
-        if data["is_active"] is False:
-            await self.delete_competition(event)
-            return
-
-        await self.send_json({"type": "update_competition", "data": data})
+        # Rendered once by the broadcaster for every list viewer
+        await self.send(text_data=event["data"])
 
-    async def increase_enrollment(self, event):
-        await self.send_json({"type": "increase_enrollment", "data": event["data"]})
+    async def send_enrollment_counts(self, event):
+        await self.send_json({"type": "enrollment_counts", "data": event["data"]})
 
     async def delete_competition(self, event):
         pk = event["data"]
@@ -126,22 +120,13 @@ class QuizListConsumer(BaseJsonConsumer):
 
 
 class QuizConsumer(BaseJsonConsumer):
+    channel_layer_alias = QUIZ_CHANNEL_LAYER
+
     user_competition: UserCompetition
     user_profile: UserProfile
 
     service: CompetitionService
 
-    @database_sync_to_async
-    def send_user_answers(self):
-        if not self.user_profile:
-            return []
-
-        return self.service.send_user_answers(self.user_profile, self.user_competition)
-
-    @database_sync_to_async
-    def resolve_user_competition(self):
-        return self.service.get_user_competition(self.user_profile)
-
     @database_sync_to_async
     def send_hint_question(self, question_id: int, hint_type: str, hint_id: int):
         if not self.user_competition:
@@ -150,17 +135,10 @@ class QuizConsumer(BaseJsonConsumer):
         return self.service.resolve_hint(self.user_competition, question_id, hint_id)
 
     async def send_question(self, event):
-        question_data = event["data"]
+        head, tail = event["data"]
+        is_eligible = await self.is_user_eligible_to_participate()
 
-        await self.send_json(
-            {
-                "question": {
-                    **json.loads(question_data),
-                    "is_eligible": await self.is_user_eligible_to_participate(),
-                },
-                "type": "new_question",
-            }
-        )
+        await self.send(text_data=f"{head}{'true' if is_eligible else 'false'}{tail}")
 
     async def send_quiz_stats(self, event):
         state = event["data"]
@@ -183,7 +161,9 @@ class QuizConsumer(BaseJsonConsumer):
     @database_sync_to_async
     def is_user_eligible_to_participate(self):
         return is_user_eligible_to_participate(
-            user_profile=self.user_profile, competition=self.competition
+            user_profile=self.user_profile,
+            competition=self.competition,
+            user_competition=self.user_competition,
         )
 
     @database_sync_to_async
@@ -199,16 +179,23 @@ class QuizConsumer(BaseJsonConsumer):
         return CompetitionSerializer(instance=self.competition).data
 
     @database_sync_to_async
-    def resolve_service(self, competition_pk: int):
-        return CompetitionService(competition_pk)
+    def resolve_session(self, competition_pk: int):
+        user_profile = getattr(self.scope["user"], "profile", None)
+        session = QuizSession(competition_pk, user_profile)
+
+        return session, session.get_message()
 
     async def connect(self):
         self.competition_id = self.scope["url_route"]["kwargs"]["competition_id"]
-        self.service = await self.resolve_service(self.competition_id)
         self.competition_group_name = f"quiz_{self.competition_id}"
-        self.competition: Competition = self.service.competition
-        self.user_profile = await self.resolve_user()
-        self.user_competition = await self.resolve_user_competition()
+
+        # A single thread hop, the whole group connects within seconds
+        session, message = await self.resolve_session(self.competition_id)
+
+        self.service = session.service
+        self.competition: Competition = session.competition
+        self.user_profile = session.user_profile
+        self.user_competition = session.user_competition
 
         await self.accept()
 
@@ -219,19 +206,7 @@ class QuizConsumer(BaseJsonConsumer):
             self.competition_group_name, self.channel_name
         )
 
-        await self.send_json(
-            {"type": "answers_history", "data": await self.send_user_answers()}
-        )
-
-        await self.send_json(await self.get_quiz_stats())
-
-        if self.competition.start_at > timezone.now():
-            await self.send_json({"type": "idle", "message": "wait for quiz to start"})
-
-        elif await database_sync_to_async(lambda: self.competition.is_in_progress)():
-            await self.send_json(await self.get_current_question())
-        else:
-            await self.finish_quiz(None)
+        await self.send_json(message)
 
     async def send_correct_answer(self, event):
         data = event["data"]
@@ -0,0 +1,120 @@
+from functools import lru_cache
+from typing import Any
+from django.conf import settings
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from django.utils.module_loading import import_string
+from djangorestframework_camel_case import util as camel_case_util
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@lru_cache(maxsize=4096)
+def camelize_key(key: str) -> str:
+    if "_" not in key:
+        return key
+
+    return camel_case_util.camelize_re.sub(camel_case_util.underscore_to_camel, key)
+
+
+def camelize_dict_key(key: Any) -> Any:
+    if isinstance(key, str):
+        return camelize_key(key)
+
+    if isinstance(key, Promise):
+        return camelize_key(force_str(key))
+
+    return key
+
+
+def camelize(data: Any) -> Any:
+    """
+    Same output as `djangorestframework_camel_case.util.camelize` with the
+    default options, with the key conversions memoized and fast paths for
+    the plain types the serializers produce.
+    """
+    if isinstance(data, dict):
+        return {
+            camelize_dict_key(key): camelize(value) for key, value in data.items()
+        }
+
+    if isinstance(data, (list, tuple)):
+        return [camelize(item) for item in data]
+
+    if data is None or isinstance(data, (str, bool, int, float)):
+        return data
+
+    return camel_case_util.camelize(data)
+
+
+class CamelCaseJSONEncoder:
+    """
+    Byte for byte the output of `CamelCaseJSONRenderer().render(...)`, with a
+    single encoder instance reused for every message instead of building a
+    renderer and a `json.JSONEncoder` per call.
+    """
+
+    def __init__(self) -> None:
+        self.encoder = JSONEncoder(
+            ensure_ascii=not api_settings.UNICODE_JSON,
+            allow_nan=not api_settings.STRICT_JSON,
+            separators=(
+                SHORT_SEPARATORS if api_settings.COMPACT_JSON else LONG_SEPARATORS
+            ),
+        )
+
+    def encode(self, content: Any) -> str:
+        if content is None:
+            return ""
+
+        return self.escape(self.encoder.encode(camelize(content)))
+
+    @staticmethod
+    def escape(text: str) -> str:
+        # Same javascript line terminators escaping as the rest framework
+        return text.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+
+
+class ORJSONCamelCaseEncoder(CamelCaseJSONEncoder):
+    """
+    orjson fast path. Output matches `CamelCaseJSONEncoder` for the quiz
+    messages, but floats use orjson's notation for very large or small
+    exponents (1e16 instead of 1e+16) and NaN becomes null. Anything orjson
+    refuses (ints over 64 bits, unsupported types) falls back to the stdlib
+    encoder.
+    """
+
+    options = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+    )
+
+    def encode(self, content: Any) -> str:
+        if content is None:
+            return ""
+
+        data = camelize(content)
+
+        try:
+            text = orjson.dumps(
+                data, default=self.encoder.default, option=self.options
+            ).decode("utf-8")
+        except TypeError:
+            text = self.encoder.encode(data)
+
+        return self.escape(text)
+
+
+@lru_cache(maxsize=None)
+def get_ws_encoder() -> CamelCaseJSONEncoder:
+    encoder_class = import_string(settings.WS_JSON_ENCODER)
+
+    if encoder_class is ORJSONCamelCaseEncoder and orjson is None:
+        encoder_class = CamelCaseJSONEncoder
+
+    return encoder_class()
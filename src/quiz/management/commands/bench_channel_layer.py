@@ -0,0 +1,76 @@
+import asyncio
+import time
+import uuid
+
+from channels.layers import DEFAULT_CHANNEL_LAYER, get_channel_layer
+from django.core.management.base import BaseCommand
+from quiz.constants import QUIZ_CHANNEL_LAYER
+from witswin.caching import get_redis_connection
+
+
+def get_redis_commands_count() -> int:
+    return sum(
+        stats["calls"]
+        for stats in get_redis_connection().info("commandstats").values()
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Broadcasts to a group of local channels through each channel layer and "
+        "reports the deliveries per second and the redis commands spent. Run "
+        "it against an otherwise idle redis, the command counts are global."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sockets", type=int, default=2000)
+        parser.add_argument("--messages", type=int, default=20)
+        parser.add_argument(
+            "--layers",
+            nargs="+",
+            default=[DEFAULT_CHANNEL_LAYER, QUIZ_CHANNEL_LAYER],
+        )
+
+    def handle(self, *args, **options):
+        sockets = options["sockets"]
+        messages = options["messages"]
+
+        self.stdout.write(f"{sockets} sockets, {messages} broadcasts")
+
+        for alias in options["layers"]:
+            elapsed, redis_commands = asyncio.run(
+                self.broadcast(alias, sockets, messages)
+            )
+
+            self.stdout.write(
+                f"  {alias:<10} {sockets * messages / elapsed:>12,.0f} deliveries/s  "
+                f"{redis_commands / messages:>10,.1f} redis commands per broadcast"
+            )
+
+    async def broadcast(self, alias: str, sockets: int, messages: int):
+        channel_layer = get_channel_layer(alias)
+        group = f"bench_{uuid.uuid4().hex}"
+
+        channels = [await channel_layer.new_channel() for _ in range(sockets)]
+
+        for channel in channels:
+            await channel_layer.group_add(group, channel)
+
+        redis_commands = get_redis_commands_count()
+        started_at = time.perf_counter()
+
+        for number in range(messages):
+            await channel_layer.group_send(
+                group, {"type": "bench.message", "number": number}
+            )
+            await asyncio.gather(
+                *(channel_layer.receive(channel) for channel in channels)
+            )
+
+        elapsed = time.perf_counter() - started_at
+        redis_commands = get_redis_commands_count() - redis_commands
+
+        for channel in channels:
+            await channel_layer.group_discard(group, channel)
+
+        return elapsed, redis_commands
@@ -0,0 +1,102 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+from quiz.encoders import CamelCaseJSONEncoder, ORJSONCamelCaseEncoder, orjson
+
+
+def build_sample_messages() -> dict[str, dict]:
+    competition = {
+        "id": 2,
+        "questions": [{"pk": pk, "number": pk} for pk in range(1, 11)],
+        "sponsors": [],
+        "participants_count": 1520,
+        "title": "Weekly quiz",
+        "details": "Answer every question right to split the prize",
+        "created_at": timezone.now(),
+        "start_at": timezone.now(),
+        "prize_amount": 100000.0,
+        "chain_id": 10,
+        "token_decimals": 6,
+        "token": "USDC",
+        "token_address": "0xFd086bC7CD5C481DCC9C85ebE478A1C0b69FCbb9",
+        "discord_url": None,
+        "twitter_url": None,
+        "email_url": "info@wits.win",
+        "telegram_url": None,
+        "token_image": None,
+        "image": None,
+        "shuffle_answers": True,
+        "split_prize": True,
+        "tx_hash": None,
+        "is_active": True,
+        "hint_count": 1,
+        "user_profile": 1,
+    }
+
+    return {
+        "quiz_stats": {
+            "type": "quiz_stats",
+            "data": {
+                "users_participating": 1234,
+                "prize_to_win": 100000.0,
+                "total_participants_count": 1520,
+                "questions_count": 10,
+                "hint_count": 1,
+                "previous_round_losses": 286,
+            },
+        },
+        "correct_answer": {
+            "type": "correct_answer",
+            "data": {"answer_id": 14, "question_number": 3, "question_id": 5},
+        },
+        "add_answer": {
+            "type": "add_answer",
+            "data": {"selected_choice_id": 14},
+        },
+        "update_competition": {"type": "update_competition", "data": competition},
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures websocket messages encoded per second on a single core for "
+        "the current renderer and the quiz encoders."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20_000)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        messages = build_sample_messages()
+
+        def renderer_encode(content):
+            return CamelCaseJSONRenderer().render(content).decode("utf-8")
+
+        encoders = {
+            "CamelCaseJSONRenderer": renderer_encode,
+            "CamelCaseJSONEncoder": CamelCaseJSONEncoder().encode,
+        }
+
+        if orjson:
+            encoders["ORJSONCamelCaseEncoder"] = ORJSONCamelCaseEncoder().encode
+
+        for message_name, message in messages.items():
+            self.stdout.write(f"{message_name} ({len(renderer_encode(message))} bytes)")
+
+            baseline = None
+
+            for encoder_name, encode in encoders.items():
+                started_at = time.perf_counter()
+
+                for _ in range(iterations):
+                    encode(message)
+
+                rate = iterations / (time.perf_counter() - started_at)
+                baseline = baseline or rate
+
+                self.stdout.write(
+                    f"  {encoder_name:<24} {rate:>12,.0f} msg/s  {rate / baseline:.2f}x"
+                )
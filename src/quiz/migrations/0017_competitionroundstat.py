@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0016_usercompetitionhint_is_used'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompetitionRoundStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.PositiveIntegerField()),
+                ('survivors_count', models.PositiveIntegerField()),
+                ('losses_count', models.PositiveIntegerField()),
+                ('choice_counts', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='round_stats', to='quiz.competition')),
+            ],
+            options={
+                'unique_together': {('competition', 'round_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:06
+
+from datetime import timedelta
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_question_count_and_end_at(apps, schema_editor):
+    Competition = apps.get_model("quiz", "Competition")
+
+    for competition in Competition.objects.annotate(
+        questions_total=Count("questions")
+    ):
+        competition.question_count = competition.questions_total
+        competition.end_at = competition.start_at + timedelta(
+            seconds=competition.question_count
+            * (competition.question_time_seconds + competition.rest_time_seconds)
+        )
+        competition.save(update_fields=["question_count", "end_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_privyprofile'),
+        ('quiz', '0017_competitionroundstat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competition',
+            name='end_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='competition',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='competition',
+            index=models.Index(fields=['is_active', 'start_at', 'end_at'], name='quiz_compet_is_acti_8fa9ae_idx'),
+        ),
+        migrations.RunPython(
+            backfill_question_count_and_end_at,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_privyprofile'),
+        ('quiz', '0018_competition_question_count_end_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='competition',
+            index=models.Index(fields=['is_active', 'created_at', 'id'], name='quiz_compet_is_acti_328806_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hintachivement',
+            index=models.Index(fields=['user_profile', 'created_at', 'id'], name='quiz_hintac_user_pr_b490c6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useranswer',
+            index=models.Index(fields=['user_competition', 'id'], name='quiz_useran_user_co_fe81a5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usercompetition',
+            index=models.Index(fields=['user_profile', 'id'], name='quiz_userco_user_pr_d71dd3_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_userprofile_wallet_address_nullable'),
+        ('quiz', '0019_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='competition',
+            index=models.Index(fields=['is_active', 'end_at'], name='quiz_compet_is_acti_6e2f40_idx'),
+        ),
+    ]
@@ -1,13 +1,10 @@
-from datetime import timedelta
-import math
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils import timezone
-from django.db.models import F, Count
 from authentication.models import UserProfile
-from .constants import ANSWER_TIME_SECOND, REST_BETWEEN_EACH_QUESTION_SECOND
 from core.fields import BigNumField
 from cloudflare_images.field import CloudflareImagesField
+from quiz.clock import CompetitionClock
 
 
 class Sponsor(models.Model):
@@ -20,9 +17,25 @@ class Sponsor(models.Model):
         return self.name
 
 
+# Fields end_at is computed from, besides question_count
+CLOCK_FIELDS = ("start_at", "question_time_seconds", "rest_time_seconds")
+
+
 class CompetitionManager(models.Manager):
-    def with_question_count(self):
-        return self.annotate(question_count=Count("questions"))
+    def for_serialization(self):
+        """
+        Everything CompetitionSerializer reads, in a constant number of
+        queries for any number of competitions.
+        """
+        return self.prefetch_related(
+            "questions",
+            "sponsors",
+            "allowed_hint_types",
+            models.Prefetch(
+                "competitionhint_set",
+                queryset=CompetitionHint.objects.select_related("hint"),
+            ),
+        ).annotate(participants_count=models.Count("usercompetition"))
 
     @property
     def not_started(self):
@@ -30,13 +43,7 @@ class CompetitionManager(models.Manager):
 
     @property
     def finished(self):
-        return self.with_question_count().filter(
-            start_at__lt=timezone.now()
-            - timezone.timedelta(
-                seconds=F("questions__count")
-                * (ANSWER_TIME_SECOND + REST_BETWEEN_EACH_QUESTION_SECOND)
-            )
-        )
+        return self.filter(is_active=True, end_at__lte=timezone.now())
 
     @property
     def started(self):
@@ -45,17 +52,9 @@ class CompetitionManager(models.Manager):
     @property
     def in_progress(self):
         # Competitions that have started but not yet finished
-        return (
-            self.with_question_count()
-            .filter(start_at__lte=timezone.now())
-            .filter(
-                start_at__gt=timezone.now()
-                - timezone.timedelta(
-                    seconds=F("question_count")
-                    * (ANSWER_TIME_SECOND + REST_BETWEEN_EACH_QUESTION_SECOND)
-                )
-            )
-        )
+        now = timezone.now()
+
+        return self.filter(is_active=True, start_at__lte=now, end_at__gt=now)
 
 
 class Competition(models.Model):
@@ -94,6 +93,10 @@ class Competition(models.Model):
 
     is_active = models.BooleanField(default=True)
 
+    # Kept in sync with the questions by the quiz signals
+    question_count = models.PositiveIntegerField(default=0, editable=False)
+    end_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     objects: CompetitionManager = CompetitionManager()
     questions: models.QuerySet["Question"]
     hint_count = models.PositiveIntegerField(default=1)
@@ -111,38 +114,85 @@ class Competition(models.Model):
         blank=True,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["is_active", "start_at", "end_at"]),
+            models.Index(fields=["is_active", "end_at"]),
+            models.Index(fields=["is_active", "created_at", "id"]),
+        ]
+
     def __str__(self):
         return f"{self.user_profile} - {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_clock_values = instance.get_clock_values()
+
+        return instance
+
+    def get_clock_values(self) -> tuple:
+        return tuple(self.__dict__.get(field) for field in CLOCK_FIELDS)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+
+        if update_fields is not None:
+            update_fields = set(update_fields)
+
+        is_update = (
+            not self._state.adding
+            and self.pk is not None
+            and not kwargs.get("force_insert")
+        )
+
+        if not is_update:
+            self.end_at = self.calculate_end_at()
+        else:
+            if update_fields is None:
+                # The quiz signals keep question_count and end_at in sync with
+                # queryset updates, the values of this instance may be stale
+                update_fields = {
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key
+                } - {"question_count", "end_at", *self.get_deferred_fields()}
+
+            clock_changed = self.get_clock_values() != getattr(
+                self, "_loaded_clock_values", None
+            ) and not update_fields.isdisjoint(CLOCK_FIELDS)
+
+            if clock_changed or "question_count" in update_fields:
+                if "question_count" not in update_fields:
+                    self.refresh_from_db(fields=["question_count"])
+
+                self.end_at = self.calculate_end_at()
+                update_fields = {*update_fields, "end_at"}
+
+            kwargs["update_fields"] = update_fields
+
+        super().save(*args, **kwargs)
+
+        self._loaded_clock_values = self.get_clock_values()
+
+    def calculate_end_at(self):
+        return self.clock.end_at
+
+    @property
+    def clock(self) -> CompetitionClock:
+        return CompetitionClock.for_competition(self)
+
     @property
     def is_in_progress(self):
-        return self.can_be_shown and (
-            self.start_at
-            + timedelta(
-                seconds=(
-                    self.questions.count()
-                    * (self.question_time_seconds + self.rest_time_seconds)
-                    - self.rest_time_seconds
-                )
-            )
-            >= timezone.now()
-        )
+        return self.clock.is_in_progress()
 
     @property
     def can_be_shown(self):
-        return self.start_at <= timezone.now()
+        return self.clock.has_started()
 
     @property
     def is_finished(self):
-        return (
-            not self.is_in_progress
-            and self.start_at
-            + timezone.timedelta(
-                seconds=self.questions.count()
-                * (self.question_time_seconds + self.rest_time_seconds)
-            )
-            <= timezone.now()
-        )
+        return self.clock.is_finished()
 
 
 class UserCompetitionManager(models.Manager):
@@ -150,10 +200,7 @@ class UserCompetitionManager(models.Manager):
         if not competition.is_active:
             return self.none()
 
-        state = math.floor(
-            (timezone.now() - competition.start_at).seconds
-            / (competition.question_time_seconds + competition.rest_time_seconds)
-        )
+        state = competition.clock.elapsed_rounds()
 
         return self.annotate().filter(
             competition=competition,
@@ -176,6 +223,9 @@ class UserCompetition(models.Model):
 
     class Meta:
         unique_together = ("user_profile", "competition")
+        indexes = [
+            models.Index(fields=["user_profile", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.user_profile} - {self.competition.title}"
@@ -214,29 +264,11 @@ class Question(models.Model):
 
     @property
     def can_be_shown(self):
-        return (
-            self.competition.start_at
-            + timezone.timedelta(
-                seconds=(self.number - 1)
-                * (
-                    self.competition.question_time_seconds
-                    + self.competition.rest_time_seconds
-                )
-            )
-            <= timezone.now()
-        )
+        return self.competition.clock.round_start(self.number) <= timezone.now()
 
     @property
     def answer_can_be_shown(self):
-        answer_time = self.competition.question_time_seconds - 2
-
-        seconds = (self.number - 1) * (
-            self.competition.question_time_seconds + self.competition.rest_time_seconds
-        ) + answer_time
-
-        return (
-            self.competition.start_at + timezone.timedelta(seconds=seconds)
-        ) <= timezone.now()
+        return self.competition.clock.answer_reveal_at(self.number) <= timezone.now()
 
     objects: QuestionManager = QuestionManager()
 
@@ -284,6 +316,9 @@ class UserAnswer(models.Model):
 
     class Meta:
         unique_together = ("user_competition", "question")
+        indexes = [
+            models.Index(fields=["user_competition", "id"]),
+        ]
 
     def __str__(self):
         return (
@@ -292,6 +327,23 @@ class UserAnswer(models.Model):
         )
 
 
+class CompetitionRoundStat(models.Model):
+    competition = models.ForeignKey(
+        Competition, on_delete=models.CASCADE, related_name="round_stats"
+    )
+    round_number = models.PositiveIntegerField()
+    survivors_count = models.PositiveIntegerField()
+    losses_count = models.PositiveIntegerField()
+    choice_counts = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("competition", "round_number")
+
+    def __str__(self):
+        return f"{self.competition.title} - round {self.round_number}"
+
+
 class CompetitionHint(models.Model):
     competition = models.ForeignKey("Competition", on_delete=models.CASCADE)
     hint = models.ForeignKey("Hint", on_delete=models.CASCADE)
@@ -331,5 +383,10 @@ class HintAchivement(models.Model):
     params = models.JSONField(default=dict, blank=True, null=True)
     used_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user_profile", "created_at", "id"]),
+        ]
+
     def __str__(self):
         return f"{self.user_profile} - {self.hint.hint_type}"
@@ -1,7 +1,79 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
 
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 100
     page_size_query_param = 'page_size'
     max_page_size = 1000
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over an indexed ordering, so every page costs the same
+    at any depth. The total count is included unless the client skips it
+    with `?count=false`. Page numbers are rejected, follow `next` instead.
+    """
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = ("-created_at", "-id")
+    count_query_param = "count"
+    page_query_param = "page"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param in request.query_params:
+            raise ValidationError(
+                {
+                    self.page_query_param: "Page numbers are not supported, "
+                    "follow the next and previous links instead."
+                }
+            )
+
+        self.count = (
+            None
+            if request.query_params.get(self.count_query_param) in ("0", "false")
+            else queryset.count()
+        )
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+
+        if self.count is not None:
+            response.data = {"count": self.count, **response.data}
+
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"] = {
+            "count": {"type": "integer", "example": 123},
+            **response_schema["properties"],
+        }
+
+        return response_schema
+
+
+class OptInKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination for the views that answered with a bare list before,
+    they keep doing so unless the client asks for a page with `cursor` or
+    `page_size`.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not any(
+            param in request.query_params
+            for param in (self.cursor_query_param, self.page_size_query_param)
+        ):
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
+
+
+class OptInIdKeysetPagination(OptInKeysetPagination):
+    ordering = ("-id",)
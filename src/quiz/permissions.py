@@ -16,11 +16,15 @@ class IsEligibleToAnswer(BasePermission):
             return False
 
         user_profile = request.user.profile
-        
+
         try:
-            user_competition = UserCompetition.objects.get(pk=user_competition_pk)
-            return is_user_eligible_to_participate(
-                user_profile, user_competition.competition
+            user_competition = UserCompetition.objects.select_related(
+                "competition"
+            ).get(pk=user_competition_pk)
+            return user_competition.user_profile_id == user_profile.pk and (
+                is_user_eligible_to_participate(
+                    user_profile, user_competition.competition, user_competition
+                )
             )
         except UserCompetition.DoesNotExist:
             return False
@@ -54,9 +54,7 @@ class HintAchivementSerializer(serializers.ModelSerializer):
 class CompetitionSerializer(serializers.ModelSerializer):
     questions = SmallQuestionSerializer(many=True, read_only=True)
     sponsors = SponsorSerializer(many=True, read_only=True)
-    participants_count = serializers.IntegerField(
-        source="participants.count", read_only=True
-    )
+    participants_count = serializers.SerializerMethodField()
     user_profile = CurrentUserProfileDefault()
     built_in_hints = CompetitionHintSerializer(
         many=True, read_only=True, source="competitionhint_set"
@@ -68,6 +66,13 @@ class CompetitionSerializer(serializers.ModelSerializer):
         model = Competition
         exclude = ("participants",)
 
+    def get_participants_count(self, competition: Competition) -> int:
+        # Annotated by Competition.objects.for_serialization()
+        if hasattr(competition, "participants_count"):
+            return competition.participants_count
+
+        return competition.participants.count()
+
 
 class ChoiceSerializer(serializers.ModelSerializer):
     is_correct = serializers.SerializerMethodField()
@@ -160,7 +165,7 @@ class CompetitionField(serializers.PrimaryKeyRelatedField):
         if self.pk_field is not None:
             return self.pk_field.to_representation(pk)
         try:
-            item = Competition.objects.get(pk=pk)
+            item = Competition.objects.for_serialization().get(pk=pk)
             serializer = CompetitionSerializer(item)
             return serializer.data
         except Competition.DoesNotExist:
@@ -0,0 +1,73 @@
+from functools import lru_cache
+
+from redis.commands.core import Script
+from witswin.caching import get_redis_connection
+from quiz.constants import ANSWER_BUFFER_TIMEOUT_SECONDS
+
+
+# Swaps the answer of a user competition and moves its vote between the
+# per choice counters in a single atomic step.
+RECORD_ANSWER_SCRIPT = """
+local previous = redis.call('HGET', KEYS[1], ARGV[1])
+if previous ~= ARGV[2] then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    if previous then
+        redis.call('HINCRBY', KEYS[2], previous, -1)
+    end
+    redis.call('HINCRBY', KEYS[2], ARGV[2], 1)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+"""
+
+
+@lru_cache(maxsize=None)
+def get_record_answer_script() -> Script:
+    # Registered once, the script is hashed on registration
+    return get_redis_connection().register_script(RECORD_ANSWER_SCRIPT)
+
+
+class AnswerBuffer:
+    """
+    Answers of a single question, kept in a redis hash until they are
+    persisted. Every answer is one atomic field write keyed by the user
+    competition, so concurrent answers never overwrite each other. A second
+    hash keeps the number of answers per choice up to date as they arrive.
+    """
+
+    def __init__(self, question_pk: int) -> None:
+        self.question_pk = question_pk
+        self.key = f"question_{question_pk}_answer_buffer"
+        self.choice_counts_key = f"question_{question_pk}_choice_counts"
+        self.redis = get_redis_connection()
+
+    def record(self, user_competition_pk: int, selected_choice_id: int):
+        get_record_answer_script()(
+            keys=[self.key, self.choice_counts_key],
+            args=[
+                str(user_competition_pk),
+                str(selected_choice_id),
+                ANSWER_BUFFER_TIMEOUT_SECONDS,
+            ],
+        )
+
+    def get_answers(self) -> dict[int, int]:
+        return {
+            int(user_competition_pk): int(selected_choice_id)
+            for user_competition_pk, selected_choice_id in self.redis.hgetall(
+                self.key
+            ).items()
+        }
+
+    def get_choice_counts(self) -> dict[int, int]:
+        return {
+            int(choice_id): int(count)
+            for choice_id, count in self.redis.hgetall(self.choice_counts_key).items()
+            if int(count) > 0
+        }
+
+    def count(self) -> int:
+        return self.redis.hlen(self.key)
+
+    def clear(self):
+        self.redis.delete(self.key, self.choice_counts_key)
@@ -0,0 +1,191 @@
+import logging
+import threading
+import time
+
+from queue import Queue
+from typing import Any, Callable
+from django.db import connection
+from quiz.constants import ANSWER_FLUSH_CHUNK_SIZE
+from quiz.models import (
+    Choice,
+    CompetitionRoundStat,
+    Question,
+    UserAnswer,
+    UserCompetition,
+)
+from quiz.services.answer_buffer import AnswerBuffer
+from quiz.services.answer_log import AnswerLog
+from quiz.services.survivors import SurvivorSet
+
+
+logger = logging.getLogger(__name__)
+
+
+def persist_answers(answers: list[dict], ignored_question_pks=frozenset()) -> int:
+    """
+    Upserts the answers with INSERT ... ON CONFLICT DO UPDATE, so an answer
+    that already exists takes the selected choice of the later one instead
+    of failing the whole chunk. Within the chunk the latest answer of a user
+    competition to a question wins, answers for choices outside the question
+    are dropped.
+    """
+    latest_answers = {
+        (answer["user_competition"], answer["question"]): answer["selected_choice"]
+        for answer in answers
+        if answer["question"] not in ignored_question_pks
+    }
+
+    choice_questions = dict(
+        Choice.objects.filter(pk__in=set(latest_answers.values())).values_list(
+            "pk", "question_id"
+        )
+    )
+
+    answer_instances = [
+        UserAnswer(
+            user_competition_id=user_competition_pk,
+            question_id=question_pk,
+            selected_choice_id=selected_choice_id,
+        )
+        for (
+            user_competition_pk,
+            question_pk,
+        ), selected_choice_id in latest_answers.items()
+        if choice_questions.get(selected_choice_id) == question_pk
+    ]
+
+    UserAnswer.objects.bulk_create(
+        answer_instances,
+        update_conflicts=True,
+        unique_fields=["user_competition", "question"],
+        update_fields=["selected_choice"],
+    )
+
+    return len(answer_instances)
+
+
+def flush_answer_log(
+    competition_pk: int,
+    closed_question_pks=frozenset(),
+    chunk_size: int = ANSWER_FLUSH_CHUNK_SIZE,
+) -> int:
+    """
+    Drains the answer log of the competition into UserAnswer in chunks,
+    starting with the entries a previous run read but never acknowledged.
+    Answers to questions in `closed_question_pks` arrived after their round
+    was flushed and are dropped. Safe to rerun.
+    """
+    answer_log = AnswerLog(competition_pk)
+    answer_log.ensure_group()
+
+    started_at = time.monotonic()
+    flushed_count = 0
+
+    for pending in (True, False):
+        while entries := answer_log.read(chunk_size, pending=pending):
+            flushed_count += persist_answers(
+                [answer for _, answer in entries if answer],
+                closed_question_pks,
+            )
+            answer_log.ack([entry_id for entry_id, _ in entries])
+
+    elapsed = time.monotonic() - started_at
+
+    logger.info(
+        f"Flushed {flushed_count} answers of competition {competition_pk} in "
+        f"{elapsed:.3f}s ({flushed_count / elapsed if elapsed else 0:.0f} rows/sec)."
+    )
+
+    return flushed_count
+
+
+class AnswerFlusher:
+    """
+    Background stage that persists the answers of closed rounds, keeping the
+    database writes off the quiz timeline thread.
+    """
+
+    def __init__(
+        self,
+        competition_pk: int,
+        chunk_size: int = ANSWER_FLUSH_CHUNK_SIZE,
+        on_round_closed: Callable[[Question], Any] | None = None,
+    ) -> None:
+        self.competition_pk = competition_pk
+        self.chunk_size = chunk_size
+        self.on_round_closed = on_round_closed
+        self.closed_question_pks: set[int] = set()
+        self.queue: Queue[Question | None] = Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def replay(self):
+        """
+        Persists the answers left in the log by a runner that died mid-round.
+        """
+        return flush_answer_log(self.competition_pk, chunk_size=self.chunk_size)
+
+    def submit(self, question: Question):
+        self.queue.put(question)
+
+    def wait(self):
+        """
+        Blocks until every submitted round is flushed.
+        """
+        self.queue.join()
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        try:
+            while True:
+                question = self.queue.get()
+
+                try:
+                    if question is None:
+                        return
+
+                    self.close_round(question)
+                except Exception:
+                    logger.exception(f"Failed to flush answers of {question}")
+                finally:
+                    self.queue.task_done()
+        finally:
+            connection.close()
+
+    def close_round(self, question: Question):
+        flush_answer_log(
+            self.competition_pk, self.closed_question_pks, self.chunk_size
+        )
+        self.closed_question_pks.add(question.pk)
+
+        survivors_count = SurvivorSet(self.competition_pk).rebuild(question.number)
+
+        previous_round = CompetitionRoundStat.objects.filter(
+            competition_id=self.competition_pk, round_number=question.number - 1
+        ).first()
+
+        previous_survivors_count = (
+            previous_round.survivors_count
+            if previous_round
+            else UserCompetition.objects.filter(
+                competition_id=self.competition_pk
+            ).count()
+        )
+
+        CompetitionRoundStat.objects.update_or_create(
+            competition_id=self.competition_pk,
+            round_number=question.number,
+            defaults={
+                "survivors_count": survivors_count,
+                "losses_count": max(previous_survivors_count - survivors_count, 0),
+                "choice_counts": AnswerBuffer(question.pk).get_choice_counts(),
+            },
+        )
+
+        if self.on_round_closed:
+            self.on_round_closed(question)
@@ -0,0 +1,110 @@
+from redis.exceptions import ResponseError
+from witswin.caching import get_redis_connection
+from quiz.constants import ANSWER_LOG_MAX_LENGTH, ANSWER_LOG_TIMEOUT_SECONDS
+
+
+class AnswerLog:
+    """
+    Append-only redis stream of every answer submitted in a competition.
+
+    The flusher reads it through a consumer group, so entries that were read
+    but never acknowledged (the runner died before persisting them) are
+    handed back on the next read and replayed without rescanning the log.
+    Acknowledged entries are trimmed right away and the stream length is
+    capped at ANSWER_LOG_MAX_LENGTH.
+    """
+
+    group_name = "answer_flusher"
+    consumer_name = "quiz_runner"
+
+    def __init__(self, competition_pk: int) -> None:
+        self.competition_pk = competition_pk
+        self.key = f"competition_{competition_pk}_answer_log"
+        self.redis = get_redis_connection()
+
+    def append(
+        self, user_competition_pk: int, question_pk: int, selected_choice_id: int
+    ) -> str:
+        pipe = self.redis.pipeline()
+        pipe.xadd(
+            self.key,
+            {
+                "user_competition": user_competition_pk,
+                "question": question_pk,
+                "selected_choice": selected_choice_id,
+            },
+            maxlen=ANSWER_LOG_MAX_LENGTH,
+            approximate=True,
+        )
+        pipe.expire(self.key, ANSWER_LOG_TIMEOUT_SECONDS)
+        entry_id, _ = pipe.execute()
+
+        return entry_id.decode()
+
+    def ensure_group(self):
+        try:
+            self.redis.xgroup_create(self.key, self.group_name, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def read(
+        self, count: int, pending: bool = False
+    ) -> list[tuple[str, dict | None]]:
+        """
+        Returns up to `count` entries as (entry_id, answer) pairs. With
+        `pending` the entries delivered before but never acknowledged are
+        returned instead of new ones. Pending entries that were trimmed in
+        the meantime come back without an answer and only need an ack.
+        """
+        response = self.redis.xreadgroup(
+            self.group_name,
+            self.consumer_name,
+            {self.key: "0" if pending else ">"},
+            count=count,
+        )
+
+        if not response:
+            return []
+
+        _, entries = response[0]
+
+        return [
+            (
+                entry_id.decode(),
+                (
+                    {field.decode(): int(value) for field, value in fields.items()}
+                    if fields
+                    else None
+                ),
+            )
+            for entry_id, fields in entries
+        ]
+
+    def ack(self, entry_ids: list[str]):
+        if not entry_ids:
+            return
+
+        pipe = self.redis.pipeline()
+        pipe.xack(self.key, self.group_name, *entry_ids)
+        pipe.xtrim(self.key, minid=self._next_entry_id(entry_ids), approximate=False)
+        pipe.execute()
+
+    def pending_count(self) -> int:
+        return self.redis.xpending(self.key, self.group_name)["pending"]
+
+    def length(self) -> int:
+        return self.redis.xlen(self.key)
+
+    def delete(self):
+        self.redis.delete(self.key)
+
+    @staticmethod
+    def _next_entry_id(entry_ids: list[str]) -> str:
+        """
+        Smallest stream id after the given ones, entries below it are trimmed.
+        """
+        milliseconds, sequence = max(
+            tuple(map(int, entry_id.split("-"))) for entry_id in entry_ids
+        )
+        return f"{milliseconds}-{sequence + 1}"
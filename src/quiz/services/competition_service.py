@@ -1,28 +1,34 @@
 from typing import Any
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from quiz.models import Competition, UserCompetition, UserAnswer, Question
 from authentication.models import UserProfile
-from django.core.serializers.json import DjangoJSONEncoder
-from quiz.serializers import UserAnswerSerializer, QuestionSerializer
+from quiz.serializers import (
+    CompetitionSerializer,
+    UserAnswerSerializer,
+    QuestionSerializer,
+)
 from channels.layers import get_channel_layer
 from django.utils import timezone
 from asgiref.sync import async_to_sync
 from quiz.utils import (
     is_user_eligible_to_participate,
     get_quiz_question_state,
-    get_round_participants,
-    get_previous_round_losses,
+    get_round_summary,
 )
+from quiz.services.answer_buffer import AnswerBuffer
+from quiz.services.answer_log import AnswerLog
+from quiz.services.quiz_list import QuizListSnapshot
+from quiz.constants import QUIZ_CHANNEL_LAYER, STATS_HINT_SNAPSHOT_SECONDS
 from django.core.cache import cache
+from quiz.encoders import get_ws_encoder
 
-from collections import Counter
-
-import json
+import uuid
 
 
 class CompetitionService:
-    def __init__(self, competition_pk) -> None:
-        self.competition = self._get_competition(competition_pk)
+    def __init__(self, competition_pk, competition: Competition | None = None) -> None:
+        self.competition = competition or self._get_competition(competition_pk)
 
     def _get_competition(self, competition_pk) -> Competition:
         try:
@@ -121,7 +127,7 @@ class CompetitionService:
 
         question_number = state or get_quiz_question_state(self.competition)
 
-        participating_count = get_round_participants(
+        participating_count, previous_round_losses = get_round_summary(
             self.competition, users_participated, question_number
         )
 
@@ -139,11 +145,9 @@ class CompetitionService:
                     )
                 ),
                 "total_participants_count": self.competition.participants.count(),
-                "questions_count": self.competition.questions.count(),
+                "questions_count": self.competition.question_count,
                 "hint_count": (user_competition.hint_count if user_competition else 0),
-                "previous_round_losses": get_previous_round_losses(
-                    self.competition, users_participated, question_number
-                ),
+                "previous_round_losses": previous_round_losses,
             },
         }
 
@@ -154,11 +158,11 @@ class CompetitionService:
         selected_choice_id: int,
     ):
         question: Question = Question.objects.can_be_shown.get(pk=question_id)
-        answers = cache.get(f"question_{question.pk}_answers", {})
 
-        answers[user_competition.pk] = selected_choice_id
-
-        cache.set(f"question_{question.pk}_answers", answers)
+        AnswerBuffer(question.pk).record(user_competition.pk, selected_choice_id)
+        AnswerLog(self.competition.pk).append(
+            user_competition.pk, question.pk, selected_choice_id
+        )
 
         return {
             "selected_choice_id": selected_choice_id,
@@ -221,24 +225,52 @@ class CompetitionHintService:
         )
 
     def resolve_stats_hint(self, question_id: int):
-        answers = cache.get(f"question_{question_id}_answers", {})
+        cache_key = f"question_{question_id}_stats_hint"
 
-        total_answers = len(answers)
+        answer_percentages = cache.get(cache_key)
 
-        answer_percentages = {}
+        if answer_percentages is not None:
+            return answer_percentages
+
+        answer_counts = AnswerBuffer(question_id).get_choice_counts()
 
-        answer_counts = Counter(answers.values())
+        total_answers = sum(answer_counts.values())
+
+        answer_percentages = {}
 
         for answer_id, count in answer_counts.items():
             percentage = (count / total_answers) * 100
             answer_percentages[answer_id] = round(percentage, 2)
 
+        cache.set(cache_key, answer_percentages, timeout=STATS_HINT_SNAPSHOT_SECONDS)
+
         return answer_percentages
 
 
+def render_question_message(question_data: dict) -> list[str]:
+    """
+    Renders the new_question message once for every socket of the group,
+    split around `isEligible`, the only per user value. Consumers send
+    `head + "true" | "false" + tail` without parsing or rendering again.
+    """
+    placeholder = uuid.uuid4().hex
+
+    message = get_ws_encoder().encode(
+        {
+            "question": {**question_data, "is_eligible": placeholder},
+            "type": "new_question",
+        }
+    )
+
+    head, tail = message.split(f'"{placeholder}"')
+
+    return [head, tail]
+
+
 class CompetitionBroadcaster:
     def __init__(self):
         self.channel_layer = get_channel_layer()
+        self.quiz_channel_layer = get_channel_layer(QUIZ_CHANNEL_LAYER)
 
     def broadcast_competition_deleted(self, competition: Competition):
         async_to_sync(self.channel_layer.group_send)(  # type: ignore
@@ -247,13 +279,49 @@ class CompetitionBroadcaster:
         )
 
     def broadcast_competition_updated(self, competition: Competition):
+        competition_pk = competition.pk
+
+        transaction.on_commit(lambda: self.send_competition_snapshot(competition_pk))
+
+    def send_competition_snapshot(self, competition_pk: int):
+        """
+        Serializes and renders the competition once for every list viewer,
+        after the commit so the inline questions saved with it are included.
+        """
+        QuizListSnapshot().invalidate([competition_pk])
+
+        competition = (
+            Competition.objects.for_serialization().filter(pk=competition_pk).first()
+        )
+
+        if competition is None:
+            return
+
+        if not competition.is_active:
+            return self.broadcast_competition_deleted(competition)
+
+        message = get_ws_encoder().encode(
+            {
+                "type": "update_competition",
+                "data": CompetitionSerializer(instance=competition).data,
+            }
+        )
+
         async_to_sync(self.channel_layer.group_send)(  # type: ignore
-            f"quiz_list",
-            {"type": "update_competition_data", "data": competition.pk},
+            "quiz_list",
+            {"type": "update_competition_data", "data": message},
         )
 
-    def broadcast_competition_stats(self, competition: Competition, state=None):
+    def broadcast_enrollment_counts(self, counts: dict[str, int]):
+        QuizListSnapshot().invalidate(counts.keys())
+
         async_to_sync(self.channel_layer.group_send)(  # type: ignore
+            "quiz_list",
+            {"type": "send_enrollment_counts", "data": counts},
+        )
+
+    def broadcast_competition_stats(self, competition: Competition, state=None):
+        async_to_sync(self.quiz_channel_layer.group_send)(  # type: ignore
             f"quiz_{competition.pk}",
             {"type": "send_quiz_stats", "data": state},
         )
@@ -261,13 +329,13 @@ class CompetitionBroadcaster:
     def broadcast_question(self, competition: Competition, question: Question):
         data = QuestionSerializer(instance=question).data
 
-        async_to_sync(self.channel_layer.group_send)(  # type: ignore
+        async_to_sync(self.quiz_channel_layer.group_send)(  # type: ignore
             f"quiz_{competition.pk}",
-            {"type": "send_question", "data": json.dumps(data, cls=DjangoJSONEncoder)},
+            {"type": "send_question", "data": render_question_message(data)},
         )
 
     def broadcast_competition_finished(self, competition: Competition):
-        async_to_sync(self.channel_layer.group_send)(  # type: ignore
+        async_to_sync(self.quiz_channel_layer.group_send)(  # type: ignore
             f"quiz_{competition.pk}",
             {"type": "finish_quiz", "data": {}},
         )
@@ -279,7 +347,7 @@ class CompetitionBroadcaster:
         question_id: int,
         question_number: int,
     ):
-        async_to_sync(self.channel_layer.group_send)(  # type: ignore
+        async_to_sync(self.quiz_channel_layer.group_send)(  # type: ignore
             f"quiz_{competition.pk}",
             {
                 "type": "send_correct_answer",
@@ -0,0 +1,68 @@
+import logging
+import threading
+
+from django.db import connection
+from django.db.models import Count
+from quiz.constants import ENROLLMENT_COUNTS_WINDOW_SECONDS
+from quiz.models import UserCompetition
+from quiz.services.competition_service import CompetitionBroadcaster
+
+
+logger = logging.getLogger(__name__)
+
+
+class EnrollmentCountAggregator:
+    """
+    Coalesces the enrollments of this process per competition and publishes
+    one `enrollment_counts` message to the quiz list per window. The counts
+    are absolute, so the messages of several processes never disagree.
+    """
+
+    def __init__(self, window_seconds: float = ENROLLMENT_COUNTS_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.competition_pks: set[int] = set()
+        self.lock = threading.Lock()
+        self.timer: threading.Timer | None = None
+
+    def add(self, competition_pk: int):
+        with self.lock:
+            self.competition_pks.add(competition_pk)
+
+            if self.timer is None:
+                self.timer = threading.Timer(self.window_seconds, self._run)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self) -> dict[str, int]:
+        with self.lock:
+            competition_pks, self.competition_pks = self.competition_pks, set()
+            self.timer = None
+
+        if not competition_pks:
+            return {}
+
+        # String keys, the channel layer msgpack rejects int map keys
+        counts = {
+            str(competition_pk): count
+            for competition_pk, count in UserCompetition.objects.filter(
+                competition_id__in=competition_pks
+            )
+            .values("competition_id")
+            .annotate(count=Count("pk"))
+            .values_list("competition_id", "count")
+        }
+
+        CompetitionBroadcaster().broadcast_enrollment_counts(counts)
+
+        return counts
+
+    def _run(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to broadcast the enrollment counts")
+        finally:
+            connection.close()
+
+
+enrollment_count_aggregator = EnrollmentCountAggregator()
@@ -0,0 +1,160 @@
+import os
+import time
+
+from typing import Iterable
+from django.core.cache import cache
+from core.utils import memcache_lock
+from quiz.constants import QUIZ_LIST_CACHE_TIMEOUT_SECONDS, QUIZ_LIST_CHANGELOG_SIZE
+from quiz.encoders import get_ws_encoder
+from quiz.models import Competition
+from quiz.serializers import CompetitionSerializer
+
+
+class QuizListSnapshot:
+    """
+    Cached, versioned render of the active competitions list. Every change to
+    a competition bumps the version and records the changed pks under it, so
+    a client reconnecting with the version it already has only receives the
+    competitions changed since then. Each competition also keeps the version
+    of its last change, the HTTP ETags are built from them.
+    """
+
+    version_key = "quiz_list_version"
+    snapshot_key = "quiz_list_snapshot"
+    lock_key = "quiz_list_snapshot_lock"
+
+    def get_change_key(self, version: int) -> str:
+        return f"quiz_list_change_{version}"
+
+    def get_competition_version_key(self, competition_pk: int | str) -> str:
+        return f"competition_{competition_pk}_version"
+
+    def get_version(self) -> int:
+        version = cache.get(self.version_key)
+
+        if version is None:
+            # Start from the clock, so versions never repeat after a flush
+            cache.add(self.version_key, int(time.time() * 1000), timeout=None)
+            version = cache.get(self.version_key)
+
+        return version
+
+    def get_competition_version(self, competition_pk: int | str) -> int:
+        key = self.get_competition_version_key(competition_pk)
+        version = cache.get(key)
+
+        if version is None:
+            # Any version newer than the last change works as a start
+            cache.add(key, self.get_version(), timeout=QUIZ_LIST_CACHE_TIMEOUT_SECONDS)
+            version = cache.get(key)
+
+        return version
+
+    def invalidate(self, competition_pks: Iterable[int | str]) -> int:
+        competition_pks = [int(competition_pk) for competition_pk in competition_pks]
+
+        self.get_version()
+        version = cache.incr(self.version_key)
+
+        cache.set_many(
+            {
+                self.get_change_key(version): competition_pks,
+                **{
+                    self.get_competition_version_key(competition_pk): version
+                    for competition_pk in competition_pks
+                },
+            },
+            timeout=QUIZ_LIST_CACHE_TIMEOUT_SECONDS,
+        )
+
+        return version
+
+    def build(self, version: int) -> dict:
+        competitions = CompetitionSerializer(
+            Competition.objects.for_serialization()
+            .filter(is_active=True)
+            .order_by("-created_at"),
+            many=True,
+        ).data
+
+        return {
+            "version": version,
+            "competitions": {
+                competition["id"]: competition for competition in competitions
+            },
+            "message": get_ws_encoder().encode(
+                {"type": "competition_list", "version": version, "data": competitions}
+            ),
+        }
+
+    def get_snapshot(self) -> dict:
+        # Read before querying, a change made meanwhile leaves it stale
+        version = self.get_version()
+        snapshot = cache.get(self.snapshot_key)
+
+        if snapshot and snapshot["version"] == version:
+            return snapshot
+
+        with memcache_lock(self.lock_key, os.getpid()) as acquired:
+            # Somebody else is rebuilding it, serve the previous one meanwhile
+            if not acquired and snapshot:
+                return snapshot
+
+            snapshot = self.build(version)
+
+            if acquired:
+                cache.set(
+                    self.snapshot_key,
+                    snapshot,
+                    timeout=QUIZ_LIST_CACHE_TIMEOUT_SECONDS,
+                )
+
+        return snapshot
+
+    def get_message(self, client_version: int | None = None) -> str:
+        """
+        Full list when the client has no usable version, otherwise the
+        competitions updated or removed since `client_version`.
+        """
+        snapshot = self.get_snapshot()
+        version = snapshot["version"]
+
+        if client_version == version:
+            return get_ws_encoder().encode(
+                {"type": "competition_list_unchanged", "version": version}
+            )
+
+        if (
+            client_version is None
+            or client_version > version
+            or version - client_version > QUIZ_LIST_CHANGELOG_SIZE
+        ):
+            return snapshot["message"]
+
+        changes = cache.get_many(
+            [
+                self.get_change_key(change_version)
+                for change_version in range(client_version + 1, version + 1)
+            ]
+        )
+
+        if len(changes) < version - client_version:
+            return snapshot["message"]
+
+        changed_pks = set().union(*changes.values())
+        competitions = snapshot["competitions"]
+
+        return get_ws_encoder().encode(
+            {
+                "type": "competition_list_diff",
+                "version": version,
+                "data": {
+                    "updated": [
+                        competition
+                        for competition_pk, competition in competitions.items()
+                        if competition_pk in changed_pks
+                    ],
+                    "removed": sorted(changed_pks - competitions.keys()),
+                },
+            }
+        )
@@ -0,0 +1,127 @@
+from django.core.cache import cache
+from django.utils import timezone
+from authentication.models import UserProfile
+from quiz.constants import (
+    QUIZ_LIST_CACHE_TIMEOUT_SECONDS,
+    QUIZ_SESSION_CACHE_TIMEOUT_SECONDS,
+)
+from quiz.models import Competition, Question, UserCompetition
+from quiz.serializers import QuestionSerializer
+from quiz.services.competition_service import CompetitionService
+from quiz.services.quiz_list import QuizListSnapshot
+from quiz.utils import is_user_eligible_to_participate
+
+
+class QuizSession:
+    """
+    Everything QuizConsumer sends on connect, assembled in a single thread
+    hop. The competition and the parts every player shares (stats, current
+    question, winners) are cached per competition version and quiz state,
+    only the rows of the connecting user are read from the database.
+    """
+
+    def __init__(self, competition_pk: int, user_profile: UserProfile | None = None):
+        self.competition_pk = int(competition_pk)
+        self.user_profile = user_profile
+        self.version = QuizListSnapshot().get_competition_version(self.competition_pk)
+        self.competition = self.get_competition()
+        self.service = CompetitionService(self.competition_pk, self.competition)
+        self.user_competition: UserCompetition | None = (
+            self.service.get_user_competition(user_profile) if user_profile else None
+        )
+
+    def get_competition_key(self) -> str:
+        return f"competition_{self.competition_pk}_session_{self.version}"
+
+    def get_competition(self) -> Competition:
+        key = self.get_competition_key()
+        competition = cache.get(key)
+
+        if competition is None:
+            competition = CompetitionService(self.competition_pk).competition
+            cache.set(key, competition, timeout=QUIZ_LIST_CACHE_TIMEOUT_SECONDS)
+
+        return competition
+
+    def get_phase(self, now) -> str:
+        clock = self.competition.clock
+
+        if not clock.has_started(now):
+            return "idle"
+
+        if clock.is_in_progress(now):
+            return "question"
+
+        return "finished"
+
+    def get_shared_state(self) -> dict:
+        now = timezone.now()
+        clock = self.competition.clock
+        state = clock.get_state(now)
+        phase = self.get_phase(now)
+        # The question payload changes once its answer is revealed
+        is_revealed = phase == "question" and clock.answer_reveal_at(state) <= now
+
+        key = f"{self.get_competition_key()}_{state}_{phase}_{int(is_revealed)}"
+        shared_state = cache.get(key)
+
+        if shared_state is None:
+            shared_state = self.build_shared_state(state, phase)
+            cache.set(key, shared_state, timeout=QUIZ_SESSION_CACHE_TIMEOUT_SECONDS)
+
+        return shared_state
+
+    def build_shared_state(self, state: int, phase: str) -> dict:
+        question = None
+
+        if phase == "question":
+            question = QuestionSerializer(
+                instance=Question.objects.can_be_shown.filter(
+                    competition=self.competition, number=state
+                ).first()
+            ).data
+
+        return {
+            "state": state,
+            "phase": phase,
+            "quiz_stats": self.service.get_quiz_stats(None, state)["data"],
+            "question": question,
+            "winners_list": (
+                self.service.calculate_quiz_winners() if phase == "finished" else None
+            ),
+        }
+
+    def get_user_answers(self) -> list:
+        if not self.user_profile:
+            return []
+
+        return self.service.send_user_answers(self.user_profile, self.user_competition)
+
+    def get_message(self) -> dict:
+        shared_state = self.get_shared_state()
+        question = shared_state["question"]
+
+        if question is not None:
+            question = {
+                **question,
+                "is_eligible": self.user_competition is not None
+                and is_user_eligible_to_participate(
+                    self.user_profile, self.competition, self.user_competition
+                ),
+            }
+
+        return {
+            "type": "session_init",
+            "data": {
+                "phase": shared_state["phase"],
+                "answers_history": self.get_user_answers(),
+                "quiz_stats": {
+                    **shared_state["quiz_stats"],
+                    "hint_count": (
+                        self.user_competition.hint_count if self.user_competition else 0
+                    ),
+                },
+                "question": question,
+                "winners_list": shared_state["winners_list"],
+            },
+        }
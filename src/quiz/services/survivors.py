@@ -0,0 +1,85 @@
+from django.db.models import Count, Q
+from witswin.caching import get_redis_connection
+from quiz.constants import SURVIVOR_SET_TIMEOUT_SECONDS
+from quiz.models import UserCompetition
+
+
+# Member stored in every built set, user competition pks start from 1. It
+# tells an empty round (everybody lost) apart from a round not built yet.
+BUILT_MARKER = "0"
+
+
+class SurvivorSet:
+    """
+    Redis sets of the user competitions still alive after each round of a
+    competition. They are rebuilt once per round from the flushed answers so
+    eligibility checks become a single membership lookup.
+    """
+
+    def __init__(self, competition_pk: int) -> None:
+        self.competition_pk = competition_pk
+        self.redis = get_redis_connection()
+
+    def get_key(self, round_number: int) -> str:
+        return f"competition_{self.competition_pk}_survivors_{round_number}"
+
+    def rebuild(self, round_number: int) -> int:
+        survivors = list(
+            UserCompetition.objects.filter(competition_id=self.competition_pk)
+            .annotate(
+                correct_answer_count=Count(
+                    "users_answer",
+                    filter=Q(users_answer__selected_choice__is_correct=True),
+                )
+            )
+            .filter(correct_answer_count__gte=round_number)
+            .values_list("pk", flat=True)
+        )
+
+        key = self.get_key(round_number)
+        building_key = f"{key}_building"
+
+        pipe = self.redis.pipeline()
+        pipe.delete(building_key)
+        pipe.sadd(building_key, BUILT_MARKER, *survivors)
+        pipe.expire(building_key, SURVIVOR_SET_TIMEOUT_SECONDS)
+        pipe.rename(building_key, key)
+        pipe.execute()
+
+        return len(survivors)
+
+    def contains(self, user_competition_pk: int, round_number: int) -> bool | None:
+        """
+        Whether the user competition survived the round, or None when the
+        round has not been built yet.
+        """
+        if round_number <= 0:
+            return True
+
+        is_built, is_survivor = self.redis.smismember(
+            self.get_key(round_number), [BUILT_MARKER, str(user_competition_pk)]
+        )
+
+        if not is_built:
+            return None
+
+        return bool(is_survivor)
+
+    def count(self, round_number: int) -> int | None:
+        pipe = self.redis.pipeline()
+        pipe.sismember(self.get_key(round_number), BUILT_MARKER)
+        pipe.scard(self.get_key(round_number))
+        is_built, members_count = pipe.execute()
+
+        if not is_built:
+            return None
+
+        return members_count - 1
+
+    def clear(self, rounds_count: int):
+        if rounds_count <= 0:
+            return
+
+        self.redis.delete(
+            *[self.get_key(round_number) for round_number in range(1, rounds_count + 1)]
+        )
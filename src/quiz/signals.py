@@ -1,7 +1,9 @@
 import json
 from celery import current_app
+from django.db import transaction
 from django.utils import timezone
-from django.db.models.signals import post_save, pre_delete
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from django_celery_beat.models import (
     PeriodicTask,
@@ -9,8 +11,9 @@ from django_celery_beat.models import (
     ClockedSchedule,
     PeriodicTasks,
 )
-from quiz.models import Competition
+from quiz.models import Competition, Hint, Question, Sponsor
 from quiz.services.competition_service import CompetitionBroadcaster
+from quiz.services.quiz_list import QuizListSnapshot
 
 
 @receiver(pre_delete, sender=Competition)
@@ -19,6 +22,51 @@ def on_competition_delete(sender, instance: Competition, **kwargs):
 
     CompetitionBroadcaster().broadcast_competition_deleted(instance)
 
+    competition_pk = instance.pk
+    transaction.on_commit(lambda: QuizListSnapshot().invalidate([competition_pk]))
+
+
+@receiver(post_save, sender=Hint)
+@receiver(pre_delete, sender=Hint)
+@receiver(post_save, sender=Sponsor)
+@receiver(pre_delete, sender=Sponsor)
+def invalidate_embedding_competitions(sender, instance: Hint | Sponsor, **kwargs):
+    if sender is Hint:
+        lookup = Q(allowed_hint_types=instance) | Q(competitionhint__hint=instance)
+    else:
+        lookup = Q(sponsors=instance)
+
+    # Serialized into the competitions, their versions have to change too
+    competition_pks = list(
+        Competition.objects.filter(lookup).values_list("pk", flat=True).distinct()
+    )
+
+    transaction.on_commit(lambda: QuizListSnapshot().invalidate(competition_pks))
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def sync_competition_question_count(sender, instance: Question, **kwargs):
+    if Question.competition.is_cached(instance):
+        competition = instance.competition
+    else:
+        competition = Competition.objects.filter(pk=instance.competition_id).first()
+
+    if competition is None:
+        return
+
+    competition.question_count = Question.objects.filter(
+        competition_id=competition.pk
+    ).count()
+    competition.end_at = competition.calculate_end_at()
+
+    # update() keeps the competition post_save (and its rebroadcast) out of it
+    Competition.objects.filter(pk=competition.pk).update(
+        question_count=competition.question_count, end_at=competition.end_at
+    )
+
+    transaction.on_commit(lambda: QuizListSnapshot().invalidate([competition.pk]))
+
 
 @receiver(post_save, sender=Competition)
 def trigger_competition_starter_task(sender, instance: Competition, created, **kwargs):
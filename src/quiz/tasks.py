@@ -5,16 +5,20 @@ from celery import shared_task
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Count, Q
 from django.utils import timezone
-from django.core.cache import cache
 from channels.layers import get_channel_layer
+from authentication.models import PrivyProfile
+from authentication.tasks import enrich_privy_profile
+from quiz.constants import WALLET_ENRICHMENT_ATTEMPTS
 from quiz.contracts import ContractManager, SafeContractException
 from quiz.models import Competition, Question, UserAnswer, UserCompetition
 from quiz.serializers import QuestionSerializer
 from quiz.utils import get_quiz_question_state
 from quiz.services.competition_service import CompetitionBroadcaster
+from quiz.services.answer_buffer import AnswerBuffer
+from quiz.services.answer_flusher import AnswerFlusher, flush_answer_log
+from quiz.services.survivors import SurvivorSet
 
 import logging
-import threading
 
 logger = logging.getLogger(__name__)
 
@@ -44,24 +48,56 @@ def handle_quiz_end(competition: Competition, winners: list[str], amount):
     return tx
 
 
+def enrich_participant_wallets(participants):
+    """
+    Fills in the wallet addresses of the provisional profiles among the
+    participants before the winners are paid, their enrichment task may
+    still be queued behind the quiz.
+    """
+    privy_ids = PrivyProfile.objects.filter(
+        profile__wallet_address__isnull=True,
+        profile__in=participants.values("user_profile"),
+    ).values_list("id", flat=True)
+
+    for privy_id in privy_ids:
+        for attempt in range(WALLET_ENRICHMENT_ATTEMPTS):
+            try:
+                enrich_privy_profile(privy_id)
+                break
+            except Exception:
+                if attempt + 1 == WALLET_ENRICHMENT_ATTEMPTS:
+                    raise
+
+                logger.warning(f"retrying the wallet enrichment of {privy_id}.")
+                time.sleep(2**attempt)
+
+
 def check_competition_state(competition: Competition):
     pass
 
 
 def evaluate_state(
-    competition: Competition, broadcaster: CompetitionBroadcaster, question_state
+    competition: Competition,
+    broadcaster: CompetitionBroadcaster,
+    flusher: AnswerFlusher,
+    question_state,
 ):
 
     logger.warning(f"sending broadcast question {question_state}.")
 
-    if competition.questions.count() < question_state:
+    if competition.question_count < question_state:
         logger.warning(f"no more questions remaining, broadcast quiz finished.")
 
+        logger.info("waiting for the remaining answers to be flushed")
+        flusher.wait()
+
         logger.info("calculating results")
         question_number = get_quiz_question_state(competition)
 
         users_participated = UserCompetition.objects.filter(competition=competition)
 
+        enrich_participant_wallets(users_participated)
+
         winners = (
             users_participated.annotate(
                 correct_answer_count=Count(
@@ -102,37 +138,19 @@ def evaluate_state(
 
     question = Question.objects.get(competition=competition, number=question_state)
 
-    broadcaster.broadcast_question(competition, question)
+    answer_buffer = AnswerBuffer(question.pk)
+    answer_buffer.clear()
 
-    cache.set(f"question_{question.pk}_answers", {}, timeout=60)
+    broadcaster.broadcast_question(competition, question)
 
     time.sleep(competition.question_time_seconds + 1.5)
 
-    def send_quiz_stats():
-        broadcaster.broadcast_competition_stats(competition, question_state + 1)
-
-    threading.Timer(1.0, send_quiz_stats).start()
-
-    def insert_question_answers():
-        answers = cache.get(f"question_{question.pk}_answers", {})
-        answer_instances = []
-        for user_competition_pk, selected_choice_id in answers.items():
-            answer_instances.append(
-                UserAnswer(
-                    user_competition_id=user_competition_pk,
-                    question=question,
-                    selected_choice_id=selected_choice_id,
-                )
-            )
-
-        UserAnswer.objects.bulk_create(answer_instances)
-
     correct_answer = question.choices.filter(is_correct=True).first()
     broadcaster.broadcast_correct_answer(
         competition, correct_answer.pk, question.pk, question.number
     )
 
-    threading.Timer(0, insert_question_answers).start()
+    flusher.submit(question)
 
     return competition.rest_time_seconds - 1.5
 
@@ -147,6 +165,16 @@ def setup_competition_to_start(self, competition_pk: int):
         logger.warning(f"Competition with pk {competition_pk} not exists.")
         return
 
+    SurvivorSet(competition.pk).clear(competition.question_count)
+    competition.round_stats.all().delete()
+
+    def send_quiz_stats(question: Question):
+        broadcaster.broadcast_competition_stats(competition, question.number + 1)
+
+    flusher = AnswerFlusher(competition.pk, on_round_closed=send_quiz_stats)
+    flusher.replay()
+    flusher.start()
+
     state = "IDLE"
 
     rest_still = (competition.start_at - timezone.now()).total_seconds() - 1
@@ -155,12 +183,22 @@ def setup_competition_to_start(self, competition_pk: int):
         f"Resting {rest_still} seconds till the quiz begins and broadcast the questions."
     )
 
-    while state != "FINISHED" or rest_still > 0:
-        time.sleep(rest_still)
-        rest_still = evaluate_state(competition, broadcaster, question_index)
-        question_index += 1
-        if rest_still == -1:
-            state = "FINISHED"
-            break
+    try:
+        while state != "FINISHED" or rest_still > 0:
+            time.sleep(rest_still)
+            rest_still = evaluate_state(
+                competition, broadcaster, flusher, question_index
+            )
+            question_index += 1
+            if rest_still == -1:
+                state = "FINISHED"
+                break
+    finally:
+        flusher.stop()
 
     broadcaster.broadcast_competition_stats(competition)
+
+
+@shared_task()
+def replay_answer_log(competition_pk: int):
+    return flush_answer_log(competition_pk)
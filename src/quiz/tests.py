@@ -1,18 +1,62 @@
+import asyncio
+import json
+import time
+
+from decimal import Decimal
+from unittest.mock import Mock, patch
 from typing import Any
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.urls import reverse
-
-from authentication.models import UserProfile
-from quiz.models import Choice, Competition, Question, UserAnswer, UserCompetition
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy
+
+from authentication.models import PrivyProfile, UserProfile
+from quiz.models import (
+    Choice,
+    Competition,
+    CompetitionHint,
+    Hint,
+    Sponsor,
+    CompetitionRoundStat,
+    Question,
+    UserAnswer,
+    UserCompetition,
+)
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
-
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+
+from quiz.clock import CompetitionClock
+from quiz.encoders import CamelCaseJSONEncoder, ORJSONCamelCaseEncoder, orjson
+from quiz.management.commands.bench_ws_encoder import build_sample_messages
+from quiz.services.answer_buffer import AnswerBuffer
+from quiz.services.answer_flusher import AnswerFlusher, flush_answer_log
+from quiz.services.answer_log import AnswerLog
+from quiz.services.enrollment_counts import enrollment_count_aggregator
+from quiz.services.quiz_list import QuizListSnapshot
+from quiz.services.session import QuizSession
+from quiz.views import QuestionView
+from quiz.services.survivors import SurvivorSet
+from quiz.tasks import evaluate_state
+from quiz.services.competition_service import (
+    CompetitionHintService,
+    CompetitionService,
+    render_question_message,
+)
+from witswin.caching import memoize
+from witswin.middleware import ConnectionAdmissionControl
 from quiz.utils import (
     get_previous_round_losses,
     get_quiz_question_state,
     get_round_participants,
+    get_round_summary,
     is_competition_finished,
     is_user_eligible_to_participate,
 )
@@ -148,7 +192,7 @@ class QuizRestfulTestCase(APITestCase, BaseQuizTestUtils):
         )
 
     def test_competition_list(self):
-        res = self.client.get(self.reverse_url("competition-list"))
+        res = self.client.get(self.reverse_url("competition-list"), {"count": "true"})
 
         self.assertEqual(res.status_code, 200)
 
@@ -204,11 +248,145 @@ class QuizRestfulTestCase(APITestCase, BaseQuizTestUtils):
             "Added user to the participants count",
         )
 
+        enrollment_count_aggregator.timer.cancel()
+
+        self.assertEqual(
+            enrollment_count_aggregator.flush(),
+            {str(self.competition.pk): 1},
+            "Broadcast the batched enrollment count",
+        )
+        self.assertIsNone(enrollment_count_aggregator.timer)
+
+    def test_competition_list_queries(self):
+        hint = Hint.objects.first()
+
+        def create_competitions(count):
+            for index in range(count):
+                competition = Competition.objects.create(
+                    title=f"Test Competition {index}",
+                    start_at=timezone.now() + timezone.timedelta(minutes=5),
+                    user_profile=self.user_profile,
+                    prize_amount=PRIZE_AMOUNT,
+                    chain_id=10,
+                    token_decimals=6,
+                    token="USDC",
+                    token_address="0x",
+                    email_url="test@test.test",
+                )
+                competition.sponsors.add(
+                    Sponsor.objects.create(name=f"Sponsor {competition.pk}")
+                )
+                competition.allowed_hint_types.add(hint)
+                CompetitionHint.objects.create(competition=competition, hint=hint)
+                UserCompetition.objects.create(
+                    user_profile=self.user_profile, competition=competition
+                )
+
+        # The same queries for any number of competitions: count,
+        # competitions, questions, sponsors, hint types, hints
+        for added_count, total_count in ((2, 3), (5, 8)):
+            create_competitions(added_count)
+
+            with self.assertNumQueries(6):
+                res = self.client.get(self.reverse_url("competition-list"))
+
+            data = res.json()
+
+            self.assertEqual(data["count"], total_count)
+            self.assertEqual(len(data["results"]), total_count)
+            self.assertEqual(data["results"][0]["participantsCount"], 1)
+            self.assertEqual(len(data["results"][0]["builtInHints"]), 1)
+
+    def test_competition_list_cursor(self):
+        url = self.reverse_url("competition-list")
+        older = Competition.objects.get(pk=self.competition.pk)
+        older.pk = None
+        older.title = "Older Competition"
+        older.save()
+        Competition.objects.filter(pk=older.pk).update(
+            created_at=self.competition.created_at - timezone.timedelta(days=1)
+        )
+
+        data = self.client.get(url, {"page_size": 1}).json()
+
+        self.assertEqual(data["results"][0]["id"], self.competition.pk)
+        self.assertIsNone(data["previous"])
+
+        data = self.client.get(data["next"]).json()
+
+        self.assertEqual(data["results"][0]["id"], older.pk)
+        self.assertIsNone(data["next"])
+
+        with self.assertNumQueries(5):
+            data = self.client.get(url, {"count": "false"}).json()
+
+        self.assertNotIn("count", data, "Counting can be skipped")
+
+        res = self.client.get(url, {"page": 2})
+
+        self.assertEqual(res.status_code, 400, "Page numbers are rejected")
+
+    def test_enrollments_list_unless_paged(self):
+        self.enroll_user(self.user_profile, self.competition)
+        url = self.reverse_url("enroll-competition")
+
+        data = self.client.get(url, headers=self.get_authenticated_headers()).json()
+
+        self.assertIsInstance(data, list, "Not paginated without a cursor")
+        self.assertEqual(data[0]["competition"], self.competition.pk)
+
+        data = self.client.get(
+            url, {"page_size": 1}, headers=self.get_authenticated_headers()
+        ).json()
+
+        self.assertEqual(data["results"][0]["competition"], self.competition.pk)
+        self.assertIsNone(data["next"])
+
+    def test_competition_conditional_get(self):
+        url = self.reverse_url("competition", pk=self.competition.pk)
+
+        res = self.client.get(url)
+        etag = res.headers["ETag"]
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("public", res.headers["Cache-Control"])
+        self.assertIn("Authorization", res.headers["Vary"])
+
+        res = self.client.get(url, headers={"If-None-Match": etag})
+
+        self.assertEqual(res.status_code, 304, "Not modified while the version holds")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.competition.title = "Updated Competition"
+            self.competition.save()
+
+        res = self.client.get(url, headers={"If-None-Match": etag})
+
+        self.assertEqual(res.status_code, 200, "Changed competitions get a new ETag")
+        self.assertNotEqual(res.headers["ETag"], etag)
+
+    def test_question_cache_stops_at_reveal(self):
+        self.update_quiz_start_at(timezone.now() - timezone.timedelta(seconds=5))
+
+        view = QuestionView(kwargs={"pk": self.questions_list[0].pk})
+        reveal_in = (
+            self.competition.clock.answer_reveal_at(1) - view.cache_now
+        ).total_seconds()
+
+        self.assertLessEqual(view.get_cache_max_age(), reveal_in)
+        self.assertIsNotNone(view.get_etag(None))
+
+        view = QuestionView(kwargs={"pk": self.questions_list[0].pk})
+        view.cache_now = self.competition.clock.answer_reveal_at(1)
+
+        self.assertEqual(view.get_cache_max_age(), 0, "Settling until round 2")
+        self.assertIsNone(view.get_etag(None))
+
     def test_competition_is_active_false(self):
         self.competition.is_active = False
 
         self.competition.save(update_fields=["is_active"])
-        res = self.client.get(self.reverse_url("competition-list"))
+        res = self.client.get(self.reverse_url("competition-list"), {"count": "true"})
         data = res.json()
         self.assertEqual(data["count"], 0, "Remove the quiz if is_active is False")
 
@@ -326,6 +504,9 @@ class QuizUtilsTestCase(TestCase, BaseQuizTestUtils):
             self.create_sample_question(8),
         ]
 
+    def tearDown(self):
+        SurvivorSet(self.competition.pk).clear(self.competition.questions.count())
+
     def create_user_profile(self, name="test_user1", address="0x1"):
         user = User.objects.create_user(name)
         profile = UserProfile.objects.create(
@@ -702,6 +883,652 @@ class QuizUtilsTestCase(TestCase, BaseQuizTestUtils):
         )
 
 
+    def test_eligibility_from_survivor_set(self):
+        user1 = self.create_user_profile("ali", "0xFD")
+        user2 = self.create_user_profile("mamad", "0x862")
+
+        user_enroll1 = self.enroll_user(user1, self.competition)
+        user_enroll2 = self.enroll_user(user2, self.competition)
+
+        first_question = self.competition.questions.order_by("number").first()
+
+        self.create_answer(user_enroll1, first_question, CORRECT_CHOICE_INDEX)
+        self.create_answer(user_enroll2, first_question, 0)
+
+        self.update_quiz_start_at(
+            timezone.now()
+            - timezone.timedelta(
+                seconds=self.competition.question_time_seconds
+                + self.competition.rest_time_seconds
+                + 1
+            )
+        )
+
+        survivors = SurvivorSet(self.competition.pk)
+
+        self.assertIsNone(survivors.contains(user_enroll1.pk, 1), "Not built yet")
+        self.assertEqual(survivors.rebuild(1), 1, "One user survived round 1")
+        self.assertEqual(survivors.count(1), 1)
+
+        self.assertTrue(survivors.contains(user_enroll1.pk, 1))
+        self.assertFalse(survivors.contains(user_enroll2.pk, 1))
+
+        self.assertTrue(
+            is_user_eligible_to_participate(user1, self.competition, user_enroll1)
+        )
+        self.assertFalse(
+            is_user_eligible_to_participate(user2, self.competition, user_enroll2)
+        )
+
+        UserAnswer.objects.filter(user_competition=user_enroll1).delete()
+
+        self.assertTrue(
+            is_user_eligible_to_participate(user1, self.competition, user_enroll1),
+            "Eligibility is read from the survivor set once it is built",
+        )
+
+
+    def test_stats_from_round_stats(self):
+        users = [
+            self.create_user_profile("ali", "0xFD"),
+            self.create_user_profile("mamad", "0x862"),
+            self.create_user_profile("mamadreza", "0x862FA"),
+        ]
+
+        for user in users:
+            self.enroll_user(user, self.competition)
+
+        self.update_quiz_start_at(
+            timezone.now()
+            - timezone.timedelta(
+                seconds=(
+                    self.competition.question_time_seconds
+                    + self.competition.rest_time_seconds
+                )
+                * 2
+                + 1
+            )
+        )
+
+        CompetitionRoundStat.objects.create(
+            competition=self.competition,
+            round_number=1,
+            survivors_count=2,
+            losses_count=1,
+        )
+        CompetitionRoundStat.objects.create(
+            competition=self.competition,
+            round_number=2,
+            survivors_count=1,
+            losses_count=1,
+        )
+
+        question_state = get_quiz_question_state(self.competition)
+
+        self.assertEqual(question_state, 3, "Must be at question 3")
+
+        with self.assertNumQueries(1):
+            participants, losers = get_round_summary(
+                self.competition, self.get_competition_participants(), question_state
+            )
+
+        self.assertEqual(participants, 1, "Read from the round 2 stats")
+        self.assertEqual(losers, 1, "One player lost at second round")
+
+    def test_clock_past_one_day(self):
+        clock = CompetitionClock(
+            start_at=timezone.now() - timezone.timedelta(days=1, seconds=30),
+            question_time_seconds=10,
+            rest_time_seconds=10,
+            question_count=10_000,
+        )
+
+        self.assertEqual(clock.get_state(), 4320 + 2)
+        self.assertTrue(clock.is_in_progress())
+        self.assertFalse(clock.is_finished())
+        self.assertEqual(
+            clock.answer_reveal_at(2), clock.start_at + timezone.timedelta(seconds=28)
+        )
+
+    def test_clock_cached_per_timeline(self):
+        clock = self.competition.clock
+
+        self.assertIs(clock, Competition.objects.get(pk=self.competition.pk).clock)
+
+        self.update_quiz_start_at(timezone.now())
+
+        self.assertIsNot(clock, self.competition.clock)
+
+    def test_render_question_message(self):
+        data = {
+            "id": 1,
+            "choices": [{"id": 1, "is_correct": None, "text": 'say "true"'}],
+            "remain_participants_count": 0,
+            "amount_won_per_user": None,
+            "is_eligible": False,
+            "number": 1,
+            "text": "\u2028 isEligible",
+        }
+
+        head, tail = render_question_message(data)
+
+        for is_eligible in (True, False):
+            self.assertEqual(
+                f"{head}{'true' if is_eligible else 'false'}{tail}",
+                CamelCaseJSONRenderer()
+                .render(
+                    {
+                        "question": {**data, "is_eligible": is_eligible},
+                        "type": "new_question",
+                    }
+                )
+                .decode("utf-8"),
+            )
+
+    def test_competition_snapshot_broadcast(self):
+        channel_layer = get_channel_layer()
+        channel_name = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)("quiz_list", channel_name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.competition.title = "Updated Competition"
+            self.competition.save()
+
+        message = async_to_sync(channel_layer.receive)(channel_name)
+
+        self.assertEqual(message["type"], "update_competition_data")
+        self.assertEqual(
+            json.loads(message["data"])["data"]["title"], "Updated Competition"
+        )
+
+        async_to_sync(channel_layer.group_discard)("quiz_list", channel_name)
+
+    def test_quiz_list_snapshot_diff(self):
+        cache.delete_many([QuizListSnapshot.version_key, QuizListSnapshot.snapshot_key])
+
+        snapshot = QuizListSnapshot()
+        full_message = json.loads(snapshot.get_message())
+        version = full_message["version"]
+
+        self.assertEqual(full_message["type"], "competition_list")
+        self.assertEqual(full_message["data"][0]["id"], self.competition.pk)
+
+        self.assertEqual(
+            json.loads(snapshot.get_message(version)),
+            {"type": "competition_list_unchanged", "version": version},
+        )
+
+        self.competition.title = "Updated Competition"
+        self.competition.save()
+        snapshot.invalidate([self.competition.pk, 404])
+
+        diff_message = json.loads(snapshot.get_message(version))
+
+        with self.assertNumQueries(0):
+            snapshot.get_message(version)
+
+        self.assertEqual(diff_message["type"], "competition_list_diff")
+        self.assertEqual(diff_message["version"], version + 1)
+        self.assertEqual(
+            diff_message["data"]["updated"][0]["title"], "Updated Competition"
+        )
+        self.assertEqual(diff_message["data"]["removed"], [404])
+
+        self.assertEqual(
+            json.loads(snapshot.get_message(version - 1))["type"],
+            "competition_list",
+            "Versions without a recorded change get the full list",
+        )
+
+    def test_quiz_session_finished(self):
+        enrollment = self.enroll_user(self.user_profile, self.competition)
+        enrollment.is_winner = True
+        enrollment.save()
+
+        message = QuizSession(self.competition.pk, self.user_profile).get_message()
+
+        self.assertEqual(message["type"], "session_init")
+        self.assertEqual(message["data"]["phase"], "finished")
+        self.assertIsNone(message["data"]["question"])
+        self.assertEqual(message["data"]["quiz_stats"]["questions_count"], 8)
+        self.assertEqual(
+            message["data"]["quiz_stats"]["hint_count"], enrollment.hint_count
+        )
+        self.assertEqual(
+            message["data"]["winners_list"][0]["user_profile__wallet_address"],
+            self.user_profile.wallet_address,
+        )
+
+        with self.assertNumQueries(0):
+            message = QuizSession(self.competition.pk).get_message()
+
+        self.assertEqual(message["data"]["answers_history"], [])
+        self.assertEqual(message["data"]["quiz_stats"]["hint_count"], 0)
+
+    def test_quiz_session_idle(self):
+        QuizSession(self.competition.pk).get_message()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.update_quiz_start_at(timezone.now() + timezone.timedelta(minutes=5))
+
+        message = QuizSession(self.competition.pk).get_message()
+
+        self.assertEqual(message["data"]["phase"], "idle", "Cached per version")
+        self.assertIsNone(message["data"]["winners_list"])
+
+    def test_question_count_sync(self):
+        round_seconds = (
+            self.competition.question_time_seconds + self.competition.rest_time_seconds
+        )
+
+        self.assertEqual(self.competition.question_count, 8)
+        self.assertEqual(
+            self.competition.end_at,
+            self.competition.start_at
+            + timezone.timedelta(seconds=8 * round_seconds),
+        )
+
+        self.questions_list.pop().delete()
+        self.competition.refresh_from_db()
+
+        self.assertEqual(self.competition.question_count, 7)
+        self.assertEqual(
+            self.competition.end_at,
+            self.competition.start_at
+            + timezone.timedelta(seconds=7 * round_seconds),
+        )
+
+        self.update_quiz_start_at(
+            timezone.now() - timezone.timedelta(seconds=7 * round_seconds + 1)
+        )
+
+        self.assertIn(self.competition, Competition.objects.finished)
+        self.assertNotIn(self.competition, Competition.objects.in_progress)
+
+    def test_stale_question_count_is_not_saved(self):
+        stale_competition = Competition.objects.get(pk=self.competition.pk)
+
+        self.questions_list.pop().delete()
+
+        stale_competition.tx_hash = "0x00"
+
+        with CaptureQueriesContext(connection) as queries:
+            stale_competition.save()
+
+        self.assertFalse(
+            any('FROM "quiz_competition"' in query["sql"] for query in queries),
+            "Saved without reading the count back",
+        )
+        self.assertNotIn('"question_count"', queries[0]["sql"])
+        self.competition.refresh_from_db()
+
+        round_seconds = (
+            self.competition.question_time_seconds + self.competition.rest_time_seconds
+        )
+
+        self.assertEqual(self.competition.question_count, 7)
+        self.assertEqual(
+            self.competition.end_at,
+            self.competition.start_at
+            + timezone.timedelta(seconds=7 * round_seconds),
+        )
+
+    @patch("authentication.tasks.get_privy_user_by_id")
+    def test_winners_without_wallet_are_enriched(self, mock_get_privy_user_by_id):
+        mock_get_privy_user_by_id.return_value = {
+            "created_at": 1729230000,
+            "linked_accounts": [
+                {"imported": False, "wallet_client": "privy", "address": "0xPrivy"}
+            ],
+        }
+
+        profile = self.create_user_profile("ali", "0xFD")
+        provisional_profile = self.create_user_profile("did:privy:new", None)
+        PrivyProfile.objects.create(profile=provisional_profile, id="did:privy:new")
+
+        enrollments = [
+            self.enroll_user(profile, self.competition),
+            self.enroll_user(provisional_profile, self.competition),
+        ]
+
+        for enrollment in enrollments:
+            for question in self.questions_list:
+                self.create_answer(enrollment, question, CORRECT_CHOICE_INDEX)
+
+        self.competition.refresh_from_db()
+
+        with patch("quiz.tasks.handle_quiz_end") as mock_handle_quiz_end:
+            evaluate_state(self.competition, Mock(), Mock(), 9)
+
+        _, winners, amount = mock_handle_quiz_end.call_args.args
+
+        self.assertCountEqual(winners, ["0xFD", "0xPrivy"], "Enriched before paying")
+        self.assertEqual(amount, PRIZE_AMOUNT / 2)
+        mock_get_privy_user_by_id.assert_called_once_with("did:privy:new")
+
+
+class WsEncoderTestCase(TestCase):
+    def get_messages(self):
+        return [
+            *build_sample_messages().values(),
+            {
+                "type": "hint_question",
+                "data": {14: 33.33, 15: 66.67},
+                "question_id": 4,
+            },
+            {
+                "winners_list": ("0xFD", "0x862"),
+                "amount_won": Decimal("12.5"),
+                "text": "پرسش \u2028 next_line \u2029",
+                "nested_list": [[{"is_correct": None}], []],
+                "big_number": 2**70,
+                gettext_lazy("lazy_key"): gettext_lazy("lazy value"),
+            },
+            None,
+        ]
+
+    def assert_parity(self, encoder):
+        for message in self.get_messages():
+            self.assertEqual(
+                encoder.encode(message),
+                CamelCaseJSONRenderer().render(message).decode("utf-8"),
+            )
+
+    def test_stdlib_encoder_parity(self):
+        self.assert_parity(CamelCaseJSONEncoder())
+
+    def test_orjson_encoder_parity(self):
+        if orjson is None:
+            self.skipTest("orjson is not installed")
+
+        self.assert_parity(ORJSONCamelCaseEncoder())
+
+
+class AnswerBufferTestCase(TestCase, BaseQuizTestUtils):
+
+    def setUp(self):
+        self.create_test_user()
+        self.competition = Competition.objects.create(
+            title="Test Competition",
+            start_at=timezone.now() - timezone.timedelta(seconds=5),
+            user_profile=self.user_profile,
+            prize_amount=PRIZE_AMOUNT,
+            chain_id=10,
+            token_decimals=6,
+            token="USDC",
+            token_address="0x",
+            email_url="test@test.test",
+        )
+
+        self.question = self.create_sample_question(1)
+        self.choices = list(self.question.choices.order_by("id"))
+        self.enrollment = self.enroll_user(self.user_profile, self.competition)
+
+        self.answer_buffer = AnswerBuffer(self.question.pk)
+        self.answer_buffer.clear()
+
+        self.answer_log = AnswerLog(self.competition.pk)
+        self.answer_log.delete()
+
+    def tearDown(self):
+        self.answer_buffer.clear()
+        self.answer_log.delete()
+        cache.delete(f"question_{self.question.pk}_stats_hint")
+
+    def test_record_answers(self):
+        self.answer_buffer.record(1, self.choices[0].pk)
+        self.answer_buffer.record(2, self.choices[1].pk)
+        self.answer_buffer.record(2, self.choices[CORRECT_CHOICE_INDEX].pk)
+
+        self.assertEqual(self.answer_buffer.count(), 2)
+        self.assertEqual(
+            self.answer_buffer.get_answers(),
+            {1: self.choices[0].pk, 2: self.choices[CORRECT_CHOICE_INDEX].pk},
+            "Latest answer of each user competition is kept",
+        )
+        self.assertEqual(
+            self.answer_buffer.get_choice_counts(),
+            {self.choices[0].pk: 1, self.choices[CORRECT_CHOICE_INDEX].pk: 1},
+            "Changed answers move their vote to the new choice",
+        )
+
+    def test_save_user_answer(self):
+        service = CompetitionService(self.competition.pk)
+
+        service.save_user_answer(
+            self.enrollment, self.question.pk, self.choices[CORRECT_CHOICE_INDEX].pk
+        )
+
+        self.assertEqual(
+            self.answer_buffer.get_answers(),
+            {self.enrollment.pk: self.choices[CORRECT_CHOICE_INDEX].pk},
+        )
+
+        stats = CompetitionHintService(self.enrollment).resolve_stats_hint(
+            self.question.pk
+        )
+
+        self.assertEqual(stats, {self.choices[CORRECT_CHOICE_INDEX].pk: 100.0})
+
+    def test_flush_answers(self):
+        users = [
+            self.enroll_user(
+                UserProfile.objects.create(
+                    user=User.objects.create_user(f"flush_user{i}"),
+                    wallet_address=f"0xF{i}",
+                ),
+                self.competition,
+            )
+            for i in range(5)
+        ]
+
+        self.create_answer(self.enrollment, self.question, 0)
+        self.answer_log.append(self.enrollment.pk, self.question.pk, self.choices[1].pk)
+
+        for user_enroll in users:
+            self.answer_log.append(
+                user_enroll.pk, self.question.pk, self.choices[CORRECT_CHOICE_INDEX].pk
+            )
+
+        flush_answer_log(self.competition.pk, chunk_size=2)
+
+        self.assertEqual(self.answer_log.length(), 0, "Flushed entries are trimmed")
+        self.assertEqual(
+            UserAnswer.objects.filter(question=self.question).count(),
+            6,
+            "Existing answers don't fail the chunk",
+        )
+        self.assertEqual(
+            UserAnswer.objects.get(
+                question=self.question, user_competition=self.enrollment
+            ).selected_choice,
+            self.choices[1],
+            "The latest answer wins over the existing one",
+        )
+
+        self.answer_log.append(users[0].pk, self.question.pk, self.choices[0].pk)
+        flush_answer_log(self.competition.pk)
+
+        self.assertEqual(
+            UserAnswer.objects.filter(question=self.question).count(),
+            6,
+            "Rerunning the flush is idempotent",
+        )
+
+    def test_replay_unacknowledged_answers(self):
+        self.answer_log.append(
+            self.enrollment.pk, self.question.pk, self.choices[CORRECT_CHOICE_INDEX].pk
+        )
+
+        self.answer_log.ensure_group()
+        self.answer_log.read(10)
+
+        self.assertEqual(self.answer_log.pending_count(), 1, "Runner died mid flush")
+
+        flush_answer_log(self.competition.pk)
+
+        self.assertEqual(self.answer_log.pending_count(), 0)
+        self.assertTrue(
+            UserAnswer.objects.filter(
+                question=self.question, user_competition=self.enrollment
+            ).exists(),
+            "Pending answers are replayed",
+        )
+
+    def test_close_round(self):
+        user_enroll = self.enroll_user(
+            UserProfile.objects.create(
+                user=User.objects.create_user("round_user"), wallet_address="0xF1"
+            ),
+            self.competition,
+        )
+
+        service = CompetitionService(self.competition.pk)
+        service.save_user_answer(
+            self.enrollment, self.question.pk, self.choices[CORRECT_CHOICE_INDEX].pk
+        )
+        service.save_user_answer(user_enroll, self.question.pk, self.choices[0].pk)
+
+        closed_questions = []
+
+        AnswerFlusher(
+            self.competition.pk, on_round_closed=closed_questions.append
+        ).close_round(self.question)
+
+        round_stat = CompetitionRoundStat.objects.get(
+            competition=self.competition, round_number=1
+        )
+
+        self.assertEqual(closed_questions, [self.question])
+        self.assertEqual(round_stat.survivors_count, 1)
+        self.assertEqual(round_stat.losses_count, 1)
+        self.assertEqual(
+            round_stat.choice_counts,
+            {
+                str(self.choices[0].pk): 1,
+                str(self.choices[CORRECT_CHOICE_INDEX].pk): 1,
+            },
+        )
+
+        SurvivorSet(self.competition.pk).clear(1)
+
+    def test_drop_answers_of_closed_rounds(self):
+        self.answer_log.append(
+            self.enrollment.pk, self.question.pk, self.choices[CORRECT_CHOICE_INDEX].pk
+        )
+
+        flush_answer_log(self.competition.pk, closed_question_pks={self.question.pk})
+
+        self.assertFalse(
+            UserAnswer.objects.filter(question=self.question).exists(),
+            "Late answers are not persisted",
+        )
+
+
+class MemoizeTestCase(TestCase):
+    def clear_entry(self, memoized, *args):
+        # Keys are the same on every run, the shared cache may still hold them
+        memoized.invalidate(*args)
+        self.addCleanup(memoized.invalidate, *args)
+
+    def test_caches_none(self):
+        calls = []
+
+        @memoize(timeout=60)
+        def find_profile(pk):
+            calls.append(pk)
+            return None
+
+        self.clear_entry(find_profile, 1)
+
+        self.assertIsNone(find_profile(1))
+        self.assertIsNone(find_profile(1))
+        self.assertEqual(calls, [1], "Negative results are cached too")
+
+        find_profile.invalidate(1)
+
+        self.assertIsNone(find_profile(1))
+        self.assertEqual(calls, [1, 1])
+
+    def test_shared_between_processes(self):
+        calls = []
+
+        def get_double(value):
+            calls.append(value)
+            return value * 2
+
+        self.clear_entry(memoize(timeout=60)(get_double), 2)
+
+        self.assertEqual(memoize(timeout=60)(get_double)(2), 4)
+        self.assertEqual(memoize(timeout=60)(get_double)(2), 4)
+        self.assertEqual(calls, [2], "Read from the shared cache")
+
+    def test_serves_stale_while_refreshing(self):
+        results = iter(["first", "second"])
+
+        @memoize(timeout=60, stale_timeout=60)
+        def get_value():
+            return next(results)
+
+        self.clear_entry(get_value)
+
+        self.assertEqual(get_value(), "first")
+
+        key = get_value.get_key((), {})
+        get_value.local_entries[key] = ("first", time.time() - 1)
+
+        self.assertEqual(get_value(), "first", "Stale while refreshing")
+
+        for _ in range(500):
+            if not get_value.refreshing:
+                break
+
+            time.sleep(0.01)
+
+        self.assertEqual(get_value(), "second")
+
+
+class ConnectionAdmissionControlTestCase(TestCase):
+    async def test_sheds_handshakes_over_budget(self):
+        handshake = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await receive()
+            await handshake.wait()
+            await send({"type": "websocket.accept"})
+            await receive()
+
+        admission = ConnectionAdmissionControl(
+            app, max_in_flight=1, retry_after_seconds=1
+        )
+
+        first = WebsocketCommunicator(admission, "/ws/quiz/1/")
+        await first.send_input({"type": "websocket.connect"})
+        await asyncio.sleep(0)
+
+        shed = WebsocketCommunicator(admission, "/ws/quiz/1/")
+        connected, _ = await shed.connect()
+        closed = await shed.receive_output()
+
+        retry_after = float(closed["reason"].removeprefix("retry-after="))
+
+        self.assertTrue(connected)
+        self.assertEqual(closed["code"], 1013)
+        self.assertTrue(1 <= retry_after <= 2, "Jittered up to twice the base")
+        self.assertEqual(
+            admission.get_stats(), {"in_flight": 1, "accepted": 0, "shed": 1}
+        )
+
+        handshake.set()
+
+        self.assertEqual((await first.receive_output())["type"], "websocket.accept")
+        self.assertEqual(
+            admission.get_stats(), {"in_flight": 0, "accepted": 1, "shed": 1}
+        )
+
+        await first.disconnect()
+
+
 class QuizConsumerTestCase(TestCase):
 
     def setUp(self):
@@ -1,42 +1,50 @@
-import math
 from django.utils import timezone
 from django.db.models import Count, Q
 from django.db.models.manager import BaseManager
 
 from authentication.models import UserProfile
-from quiz.models import Competition, UserCompetition
+from quiz.models import Competition, CompetitionRoundStat, UserCompetition
+from quiz.services.survivors import SurvivorSet
 
 
 def is_user_eligible_to_participate(
-    user_profile: UserProfile | None, competition: Competition
+    user_profile: UserProfile | None,
+    competition: Competition,
+    user_competition: UserCompetition | None = None,
 ) -> bool:
     if not user_profile:
         return False
-    try:
-        user_competition = UserCompetition.objects.get(
-            user_profile=user_profile, competition=competition
-        )
-    except UserCompetition.DoesNotExist:
-        return False
+
+    if user_competition is None:
+        try:
+            user_competition = UserCompetition.objects.get(
+                user_profile=user_profile, competition=competition
+            )
+        except UserCompetition.DoesNotExist:
+            return False
 
     if competition.start_at >= timezone.now():
         return True
 
+    if competition.is_active is False or competition.is_in_progress is False:
+        return False
+
+    state = get_quiz_question_state(competition) - 1
+
+    is_survivor = SurvivorSet(competition.pk).contains(user_competition.pk, state)
+
+    if is_survivor is not None:
+        return is_survivor
+
     has_wrong_answer = user_competition.users_answer.filter(
         selected_choice__is_correct=False
     ).exists()
 
-    if (
-        competition.is_active is False
-        or competition.is_in_progress is False
-        or has_wrong_answer
-    ):
+    if has_wrong_answer:
         return False
 
     question_number = user_competition.users_answer.count()
 
-    state = get_quiz_question_state(competition) - 1
-
     if state > question_number:
         return False
 
@@ -44,46 +52,72 @@ def is_user_eligible_to_participate(
 
 
 def get_quiz_question_state(competition: Competition):
+    return competition.clock.get_state()
 
-    start_at = competition.start_at
 
-    if timezone.is_naive(start_at):
-        start_at = timezone.make_aware(start_at, timezone.get_current_timezone())
-    else:
-        start_at = start_at.astimezone(timezone.get_current_timezone())
+def is_competition_finished(competition: Competition):
+    clock = competition.clock
+
+    return clock.has_started() and clock.end_at <= timezone.now()
+
 
-    if start_at > timezone.now():
+def get_survived_rounds(competition: Competition, question_number: int) -> int:
+    """
+    Number of rounds a participant has to survive to be counted as
+    participating at the given question.
+    """
+    if question_number <= 0:
         return 0
 
-    return min(
-        math.floor(
-            (timezone.now() - start_at).seconds
-            / (competition.question_time_seconds + competition.rest_time_seconds)
-        )
-        + 1,
-        competition.questions.count(),
-    )
+    total_questions = competition.question_count
+    question_number = min(question_number, total_questions)
 
+    if competition.is_finished:
+        question_number += 1
 
-def is_competition_finished(competition: Competition):
-    start_at = competition.start_at
+    return question_number - 1
 
-    if timezone.is_naive(start_at):
-        start_at = timezone.make_aware(start_at, timezone.get_current_timezone())
-    else:
-        start_at = start_at.astimezone(timezone.get_current_timezone())
 
-    if start_at > timezone.now():
-        return False
+def get_survivors_counts(
+    competition: Competition,
+    total_participants: BaseManager[UserCompetition],
+    round_numbers,
+) -> dict[int, int]:
+    """
+    Survivors count of each round, read from the materialized round stats
+    and aggregated from the answers only for the rounds not closed yet.
+    """
+    survivors_counts = dict(
+        CompetitionRoundStat.objects.filter(
+            competition=competition,
+            round_number__in=[number for number in round_numbers if number > 0],
+        ).values_list("round_number", "survivors_count")
+    )
 
-    return (
-        math.floor(
-            (timezone.now() - start_at).seconds
-            / (competition.question_time_seconds + competition.rest_time_seconds)
+    for round_number in round_numbers:
+        if round_number in survivors_counts:
+            continue
+
+        if round_number <= 0:
+            survivors_counts[round_number] = total_participants.count()
+            continue
+
+        survivors_counts[round_number] = (
+            total_participants.annotate(
+                correct_answer_count=Count(
+                    "users_answer",
+                    filter=Q(users_answer__selected_choice__is_correct=True),
+                ),
+            )
+            .filter(
+                correct_answer_count__gte=round_number,
+                # incorrect_answer_count=0,
+            )
+            .distinct()
+            .count()
         )
-        + 1
-        > competition.questions.count()
-    )
+
+    return survivors_counts
 
 
 def get_round_participants(
@@ -91,28 +125,38 @@ def get_round_participants(
     total_participants: BaseManager[UserCompetition],
     question_number: int,
 ) -> int:
-    if question_number <= 0:
-        return total_participants.count()
+    round_number = get_survived_rounds(competition, question_number)
 
-    total_questions = competition.questions.count()
-    question_number = min(question_number, total_questions)
+    return get_survivors_counts(competition, total_participants, [round_number])[
+        round_number
+    ]
 
-    if competition.is_finished:
-        question_number += 1
 
-    return (
-        total_participants.annotate(
-            correct_answer_count=Count(
-                "users_answer",
-                filter=Q(users_answer__selected_choice__is_correct=True),
-            ),
-        )
-        .filter(
-            correct_answer_count__gte=question_number - 1,
-            # incorrect_answer_count=0,
-        )
-        .distinct()
-        .count()
+def get_round_summary(
+    competition: Competition,
+    total_participants: BaseManager[UserCompetition],
+    question_number: int,
+) -> tuple[int, int]:
+    """
+    Participating count and previous round losses of the given question.
+    """
+    round_number = get_survived_rounds(competition, question_number)
+    previous_round_number = get_survived_rounds(competition, question_number - 1)
+
+    survivors_counts = get_survivors_counts(
+        competition, total_participants, {round_number, previous_round_number}
+    )
+
+    participating_count = survivors_counts[round_number]
+
+    return participating_count, max(
+        survivors_counts[previous_round_number]
+        - (
+            participating_count
+            if competition.can_be_shown
+            else total_participants.count()
+        ),
+        0,
     )
 
 
@@ -121,16 +165,4 @@ def get_previous_round_losses(
     total_participants: BaseManager[UserCompetition],
     question_number: int,
 ):
-
-    if competition.can_be_shown:
-        participating_count = get_round_participants(
-            competition, total_participants, question_number
-        )
-    else:
-        participating_count = total_participants.count()
-
-    return max(
-        get_round_participants(competition, total_participants, question_number - 1)
-        - participating_count,
-        0,
-    )
+    return get_round_summary(competition, total_participants, question_number)[1]
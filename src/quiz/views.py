@@ -6,9 +6,17 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
 from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.functional import cached_property
+from django.views.decorators.http import condition
 from django.db.models import Prefetch, OuterRef
 
-from quiz.paginations import StandardResultsSetPagination
+from quiz.constants import HTTP_CACHE_MAX_AGE_SECONDS
+from quiz.paginations import (
+    KeysetPagination,
+    OptInIdKeysetPagination,
+    OptInKeysetPagination,
+)
 from quiz.filters import CompetitionFilter, NestedCompetitionFilter
 from quiz.models import (
     Competition,
@@ -28,40 +36,154 @@ from quiz.serializers import (
     HintAchivementSerializer,
     HintSerializer,
 )
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from quiz.services.enrollment_counts import enrollment_count_aggregator
+from quiz.services.quiz_list import QuizListSnapshot
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETags built from the competition versions with 304 answers to a
+    matching If-None-Match, plus the Cache-Control and Vary headers that let
+    a shared cache keep the anonymous responses.
+    """
+
+    def get_etag(self, request, *args, **kwargs) -> str | None:
+        """
+        Version of the response, None skips the ETag and the 304 answers.
+        """
+        return None
+
+    def get_cache_max_age(self) -> int:
+        """
+        Seconds the response stays fresh, 0 makes caches revalidate it.
+        """
+        return HTTP_CACHE_MAX_AGE_SECONDS
+
+    def get(self, request, *args, **kwargs):
+        response = condition(etag_func=self.get_etag)(super().get)(
+            request, *args, **kwargs
+        )
+
+        max_age = self.get_cache_max_age()
+
+        if max_age > 0 and request.user.is_authenticated:
+            patch_cache_control(response, private=True, max_age=max_age)
+        elif max_age > 0:
+            patch_cache_control(response, public=True, max_age=max_age)
+        else:
+            patch_cache_control(response, no_cache=True)
 
+        patch_vary_headers(response, ["Authorization"])
 
-class CompetitionViewList(ListCreateAPIView):
+        return response
+
+
+class CompetitionViewList(ConditionalGetMixin, ListCreateAPIView):
     filter_backends = []
-    queryset = Competition.objects.filter(is_active=True).order_by("-created_at")
-    pagination_class = StandardResultsSetPagination
+    queryset = (
+        Competition.objects.for_serialization()
+        .filter(is_active=True)
+        .order_by("-created_at")
+    )
+    pagination_class = KeysetPagination
     serializer_class = CompetitionSerializer
 
+    def get_etag(self, request, *args, **kwargs):
+        return f"competitions-{QuizListSnapshot().get_version()}"
+
 
 class UserCompetitionView(ModelViewSet):
     serializer_class = CompetitionCreateSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Competition.objects.filter(user_profile=self.request.user.profile)
+        return Competition.objects.filter(
+            user_profile=self.request.user.profile
+        ).prefetch_related("questions__choices")
 
 
-class CompetitionView(RetrieveAPIView):
-    queryset = Competition.objects.filter(is_active=True)
+class CompetitionView(ConditionalGetMixin, RetrieveAPIView):
+    queryset = Competition.objects.for_serialization().filter(is_active=True)
     serializer_class = CompetitionSerializer
 
+    def get_etag(self, request, *args, **kwargs):
+        pk = kwargs["pk"]
+
+        return f"competition-{pk}-{QuizListSnapshot().get_competition_version(pk)}"
 
-class QuestionView(RetrieveAPIView):
+
+class QuestionView(ConditionalGetMixin, RetrieveAPIView):
     http_method_names = ["get"]
     serializer_class = QuestionSerializer
     queryset = Question.objects.all()
 
+    @cached_property
+    def cache_question(self) -> Question | None:
+        return (
+            Question.objects.select_related("competition")
+            .filter(pk=self.kwargs["pk"])
+            .first()
+        )
+
+    @cached_property
+    def cache_now(self):
+        return timezone.now()
+
+    def is_settling(self) -> bool:
+        """
+        From the answer reveal until the next round starts the correct
+        choice and the remaining participants are still being written.
+        """
+        question = self.cache_question
+        clock = question.competition.clock
+
+        return (
+            clock.answer_reveal_at(question.number)
+            <= self.cache_now
+            < clock.round_start(question.number + 1)
+        )
+
+    def get_etag(self, request, *args, **kwargs):
+        question = self.cache_question
+
+        if question is None or self.is_settling():
+            return None
+
+        clock = question.competition.clock
+        competition_version = QuizListSnapshot().get_competition_version(
+            question.competition_id
+        )
+
+        # The state covers the eligibility, the reveal flag the choices
+        return (
+            f"question-{question.pk}-{competition_version}-"
+            f"{clock.get_state(self.cache_now)}-"
+            f"{int(clock.answer_reveal_at(question.number) <= self.cache_now)}"
+        )
+
+    def get_cache_max_age(self):
+        question = self.cache_question
+
+        if question is None or self.is_settling():
+            return 0
+
+        reveal_at = question.competition.clock.answer_reveal_at(question.number)
+
+        if self.cache_now < reveal_at:
+            # Never cache the hidden choices past their reveal time
+            return min(
+                int((reveal_at - self.cache_now).total_seconds()),
+                HTTP_CACHE_MAX_AGE_SECONDS,
+            )
+
+        return HTTP_CACHE_MAX_AGE_SECONDS
+
 
 class EnrollInCompetitionView(ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     filter_backends = [CompetitionFilter]
     queryset = UserCompetition.objects.prefetch_related("usercompetitionhint_set")
+    pagination_class = OptInIdKeysetPagination
 
     serializer_class = UserCompetitionSerializer
 
@@ -87,12 +209,7 @@ class EnrollInCompetitionView(ListCreateAPIView):
         user = self.request.user.profile  # type: ignore
         serializer.save(user_profile=user)
 
-        channel_layer = get_channel_layer()
-
-        async_to_sync(channel_layer.group_send)(  # type: ignore
-            f"quiz_list",
-            {"type": "increase_enrollment", "data": competition.id},
-        )
+        enrollment_count_aggregator.add(competition.pk)
 
     def get_queryset(self):
         return self.queryset.filter(user_profile=self.request.user.profile)
@@ -103,9 +220,12 @@ class UserAnswerView(ListCreateAPIView):
     serializer_class = UserAnswerSerializer
     filter_backends = [NestedCompetitionFilter]
     queryset = UserAnswer.objects.all()
+    pagination_class = OptInIdKeysetPagination
 
     def get_queryset(self):
-        return self.queryset.filter(competition__start_at__gte=timezone.now())
+        return self.queryset.filter(
+            user_competition__user_profile=self.request.user.profile
+        )
 
     def perform_create(self, serializer):
         serializer.save()
@@ -115,12 +235,17 @@ class UserHintsView(ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = HintAchivementSerializer
     queryset = HintAchivement.objects.order_by("is_used")
+    pagination_class = OptInKeysetPagination
 
     def get_queryset(self):
         return self.queryset.filter(user_profile=self.request.user.profile)
 
 
-class HintsView(ListAPIView):
+class HintsView(ConditionalGetMixin, ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = HintSerializer
     queryset = Hint.objects.filter(is_active=True)
+
+    def get_etag(self, request, *args, **kwargs):
+        # Hint changes bump the competitions version as well
+        return f"hints-{QuizListSnapshot().get_version()}"
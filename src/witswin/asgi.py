@@ -18,14 +18,14 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'witswin.settings')
 
 django_asgi_app = get_asgi_application()
 
-from .middleware import BasicTokenHeaderAuthentication
+from .middleware import BasicTokenHeaderAuthentication, ConnectionAdmissionControl
 from witswin.routing import websocket_urlpatterns
 
 
 
 application = ProtocolTypeRouter({
   "http": django_asgi_app,
-  "websocket": AllowedHostsOriginValidator(BasicTokenHeaderAuthentication(
-    URLRouter(websocket_urlpatterns)
+  "websocket": AllowedHostsOriginValidator(ConnectionAdmissionControl(
+    BasicTokenHeaderAuthentication(URLRouter(websocket_urlpatterns))
   )),
 })
@@ -1,25 +1,207 @@
-from functools import wraps
+from collections import OrderedDict
+from functools import lru_cache, update_wrapper
+from django.conf import settings
 from django.core.cache import cache
+from django.db import connections
+from core.utils import memcache_lock
 
+import hashlib
+import logging
+import os
+import threading
+import time
 
-def cache_function_in_seconds(seconds):
-    def decorator(func):
-        @wraps(func)
-        def wrapped(*args, **kwargs):
-            # Create a unique cache key based on the function name and arguments
-            cache_key = f"{func.__name__}_{'_'.join(str(arg) for arg in args)}_{'_'.join(f'{k}-{v}' for k, v in kwargs.items())}"
+import redis
+
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_redis_connection() -> redis.Redis:
+    """
+    Process wide redis client for the structures the django cache api can't
+    express (hashes, sets, streams). Shares the redis instance of the cache.
+    """
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
+class MemoizedFunction:
+    """
+    Results of a function by arguments, in a bounded LRU of the process in
+    front of the django cache. Entries are (value, fresh until) envelopes, so
+    None is cached like any other result.
+
+    Only one caller per key recomputes an expired result, in the process and
+    across them, the others wait for it. For `stale_timeout` seconds after
+    expiring the previous result keeps being served while one caller
+    refreshes it in the background.
+
+    Keys hash the repr of the arguments, so they need a stable repr. Bump
+    `version` when the shape of the result changes.
+    """
+
+    def __init__(
+        self,
+        func,
+        timeout: int,
+        stale_timeout: int = 0,
+        local_size: int = 128,
+        version: int = 1,
+        lock_timeout: int = 10,
+    ):
+        self.func = func
+        self.timeout = timeout
+        self.stale_timeout = stale_timeout
+        self.local_size = local_size
+        self.lock_timeout = lock_timeout
+        self.key_prefix = f"memoize_{func.__module__}.{func.__qualname__}_v{version}"
+
+        self.local_entries: OrderedDict[str, tuple] = OrderedDict()
+        self.lock = threading.Lock()
+        # Striped, a lock per key would grow with the arguments
+        self.flight_locks = [threading.Lock() for _ in range(32)]
+        self.refreshing: set[str] = set()
+
+        update_wrapper(self, func)
+
+    def get_key(self, args, kwargs) -> str:
+        arguments = repr((args, sorted(kwargs.items()))).encode("utf-8")
+
+        return f"{self.key_prefix}_{hashlib.sha256(arguments).hexdigest()}"
+
+    def get_entry(self, key: str) -> tuple | None:
+        now = time.time()
+
+        with self.lock:
+            entry = self.local_entries.get(key)
+
+            if entry is not None:
+                if now < entry[1] + self.stale_timeout:
+                    self.local_entries.move_to_end(key)
+                    return entry
+
+                del self.local_entries[key]
+
+        entry = cache.get(key)
+
+        if entry is not None:
+            self.set_local(key, entry)
+
+        return entry
+
+    def set_local(self, key: str, entry: tuple):
+        with self.lock:
+            self.local_entries[key] = entry
+            self.local_entries.move_to_end(key)
+
+            while len(self.local_entries) > self.local_size:
+                self.local_entries.popitem(last=False)
+
+    def set(self, key: str, value):
+        entry = (value, time.time() + self.timeout)
+
+        cache.set(key, entry, timeout=self.timeout + self.stale_timeout)
+        self.set_local(key, entry)
+
+    def __call__(self, *args, **kwargs):
+        key = self.get_key(args, kwargs)
+        entry = self.get_entry(key)
 
-            # Check if the result is already cached
-            result = cache.get(cache_key)
-            if result is not None:
-                return result
+        if entry is not None:
+            value, fresh_until = entry
 
-            # Call the original function and cache the result
-            result = func(*args, **kwargs)
-            cache.set(cache_key, result, timeout=seconds)
+            if time.time() < fresh_until:
+                return value
 
-            return result
+            if time.time() < fresh_until + self.stale_timeout:
+                self.refresh_in_background(key, args, kwargs)
 
-        return wrapped
+                return value
+
+        return self.compute(key, args, kwargs)
+
+    def compute(self, key: str, args, kwargs):
+        flight_lock = self.flight_locks[hash(key) % len(self.flight_locks)]
+
+        with flight_lock:
+            # Computed by the caller we waited for
+            entry = self.get_entry(key)
+
+            if entry is not None and time.time() < entry[1]:
+                return entry[0]
+
+            with memcache_lock(
+                f"{key}_lock", os.getpid(), lock_expire=self.lock_timeout
+            ) as acquired:
+                if not acquired:
+                    entry = self.wait_for_entry(key)
+
+                    if entry is not None:
+                        return entry[0]
+
+                value = self.func(*args, **kwargs)
+                self.set(key, value)
+
+            return value
+
+    def wait_for_entry(self, key: str) -> tuple | None:
+        deadline = time.monotonic() + self.lock_timeout
+
+        while time.monotonic() < deadline:
+            entry = cache.get(key)
+
+            if entry is not None and time.time() < entry[1]:
+                self.set_local(key, entry)
+                return entry
+
+            time.sleep(0.05)
+
+        return None
+
+    def refresh_in_background(self, key: str, args, kwargs):
+        with self.lock:
+            if key in self.refreshing:
+                return
+
+            self.refreshing.add(key)
+
+        threading.Thread(
+            target=self.refresh, args=(key, args, kwargs), daemon=True
+        ).start()
+
+    def refresh(self, key: str, args, kwargs):
+        try:
+            with memcache_lock(
+                f"{key}_lock", os.getpid(), lock_expire=self.lock_timeout
+            ) as acquired:
+                # Another process is refreshing it already
+                if acquired:
+                    self.set(key, self.func(*args, **kwargs))
+        except Exception:
+            logger.exception("Failed to refresh %s", self.key_prefix)
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+            connections.close_all()
+
+    def invalidate(self, *args, **kwargs):
+        # The other processes keep their local entry until it expires
+        key = self.get_key(args, kwargs)
+
+        cache.delete(key)
+
+        with self.lock:
+            self.local_entries.pop(key, None)
+
+
+def memoize(timeout: int, **options):
+    def decorator(func) -> MemoizedFunction:
+        return MemoizedFunction(func, timeout, **options)
 
     return decorator
+
+
+def cache_function_in_seconds(seconds):
+    return memoize(timeout=seconds)
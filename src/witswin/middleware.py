@@ -1,7 +1,12 @@
 # middleware.py
 import base64
+import logging
+import random
+import time
 from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
 
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from rest_framework.authtoken.models import Token
 from channels.db import database_sync_to_async
@@ -9,6 +14,9 @@ from channels.db import database_sync_to_async
 from authentication.auth import PrivyJWTAuthentication
 
 
+logger = logging.getLogger(__name__)
+
+
 @database_sync_to_async
 def get_user_from_basic_auth(tk: str):
     if tk.count(".") > 1:
@@ -42,10 +50,10 @@ class BasicTokenHeaderAuthentication:
         headers = dict(scope["headers"])
         cookie = SimpleCookie()
 
-        query_params = scope["query_string"].decode("utf-8")
+        query_params = parse_qs(scope["query_string"].decode("utf-8"))
 
         if "auth" in query_params:
-            scope["user"] = await get_user_from_basic_auth(query_params.split("=")[1])
+            scope["user"] = await get_user_from_basic_auth(query_params["auth"][0])
 
         elif headers.get(b"cookie"):
             scope["user"] = AnonymousUser()
@@ -57,3 +65,102 @@ class BasicTokenHeaderAuthentication:
             scope["user"] = AnonymousUser()
 
         return await self.app(scope, receive, send)
+
+
+class ConnectionAdmissionControl:
+    """
+    Caps the websocket handshakes in flight in this process, from the connect
+    until the consumer accepts or closes the socket. Over the budget the
+    socket is closed right away with 1013 (try again later) and a jittered
+    `retry-after=<seconds>` reason, so a reconnect storm spreads out instead
+    of piling onto the database.
+    """
+
+    close_code = 1013
+    log_interval_seconds = 1
+
+    def __init__(self, app, max_in_flight=None, retry_after_seconds=None):
+        self.app = app
+        self.max_in_flight = max_in_flight or settings.WS_CONNECT_CONCURRENCY
+        self.retry_after_seconds = (
+            retry_after_seconds or settings.WS_CONNECT_RETRY_AFTER_SECONDS
+        )
+
+        # Everything runs on the event loop of the process, no locking needed
+        self.in_flight = 0
+        self.accepted_count = 0
+        self.shed_count = 0
+        self.logged_at = 0.0
+
+    def get_stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "accepted": self.accepted_count,
+            "shed": self.shed_count,
+        }
+
+    def get_retry_after(self) -> float:
+        return round(self.retry_after_seconds * (1 + random.random()), 1)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "websocket":
+            return await self.app(scope, receive, send)
+
+        if self.in_flight >= self.max_in_flight:
+            return await self.shed(receive, send)
+
+        self.in_flight += 1
+        released = False
+
+        def release():
+            nonlocal released
+
+            if not released:
+                released = True
+                self.in_flight -= 1
+
+        async def admitted_send(message):
+            if message["type"] == "websocket.accept":
+                self.accepted_count += 1
+                release()
+            elif message["type"] == "websocket.close":
+                release()
+
+            await send(message)
+
+        async def admitted_receive():
+            message = await receive()
+
+            if message["type"] == "websocket.disconnect":
+                release()
+
+            return message
+
+        try:
+            return await self.app(scope, admitted_receive, admitted_send)
+        finally:
+            release()
+
+    async def shed(self, receive, send):
+        self.shed_count += 1
+
+        message = await receive()
+
+        if message["type"] != "websocket.connect":
+            return
+
+        # Accepted first, browsers never see the close code of a rejection
+        await send({"type": "websocket.accept"})
+        await send(
+            {
+                "type": "websocket.close",
+                "code": self.close_code,
+                "reason": f"retry-after={self.get_retry_after()}",
+            }
+        )
+
+        now = time.monotonic()
+
+        if now - self.logged_at >= self.log_interval_seconds:
+            self.logged_at = now
+            logger.warning("Shedding websocket connections: %s", self.get_stats())
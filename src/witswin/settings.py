@@ -45,6 +45,9 @@ IMAGE_DELIVERY_URL = os.environ.get("IMAGE_DELIVERY_URL")
 PRIVY_JWKS_URL = os.environ.get("PRIVY_JWKS_URL")
 PRIVY_APP_SECRET = os.environ.get("PRIVY_APP_SECRET")
 PRIVY_APP_ID = os.environ.get("PRIVY_APP_ID")
+# Let first logins through with a provisional profile, fetching the privy
+# user (wallet address) in a celery task instead of during the request
+PRIVY_ASYNC_PROVISIONING = bool(os.environ.get("PRIVY_ASYNC_PROVISIONING"))
 
 REDIS_URL = os.environ.get("REDIS_URL", "redis://redis:6379")
 
@@ -193,6 +196,14 @@ CHANNEL_LAYERS = {
             "hosts": [REDIS_URL],
         },
     },
+    # Competition groups: one redis publish per broadcast, every process
+    # subscribes once per group and delivers to its own sockets
+    "quiz": {
+        "BACKEND": "channels_redis.pubsub.RedisPubSubChannelLayer",
+        "CONFIG": {
+            "hosts": [REDIS_URL],
+        },
+    },
 }
 
 CSRF_TRUSTED_ORIGINS = [
@@ -237,6 +248,28 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Encoder of the websocket messages, "quiz.encoders.ORJSONCamelCaseEncoder"
+# is faster when orjson is installed
+WS_JSON_ENCODER = os.environ.get(
+    "WS_JSON_ENCODER", "quiz.encoders.CamelCaseJSONEncoder"
+)
+
+# Websocket handshakes a process runs at once, the rest are told to retry
+# after WS_CONNECT_RETRY_AFTER_SECONDS (up to twice that, jittered)
+WS_CONNECT_CONCURRENCY = int(os.environ.get("WS_CONNECT_CONCURRENCY", "100"))
+WS_CONNECT_RETRY_AFTER_SECONDS = float(
+    os.environ.get("WS_CONNECT_RETRY_AFTER_SECONDS", "2")
+)
+
+# Worker processes recovering the wallet login signatures (0 runs them in
+# the request, only spare cores pay off), and the recoveries a process
+# queues before answering 429
+SIGNATURE_WORKERS = int(
+    os.environ.get("SIGNATURE_WORKERS", min(2, (os.cpu_count() or 1) - 1))
+)
+SIGNATURE_MAX_PENDING = int(os.environ.get("SIGNATURE_MAX_PENDING", "64"))
+SIGNATURE_TIMEOUT_SECONDS = float(os.environ.get("SIGNATURE_TIMEOUT_SECONDS", "5"))
+
 CELERY_BROKER_URL = REDIS_URL
 
 CELERY_RESULT_BACKEND = "django-db"